@@ -1,6 +1,14 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import RotatingRefreshToken, claims_on_use, remember_blacklisted
 
 User = get_user_model()
 
@@ -36,3 +44,50 @@ class RegisterSerializer(serializers.ModelSerializer):
             email=validated_data['email'],
             password=validated_data['password'],
         )
+
+
+class LoginSerializer(TokenObtainPairSerializer):
+    """Token pair for a username and password; ``session: true`` also asks for a Django session.
+
+    The password is checked once, by ``authenticate()`` in the parent class;
+    the view starts the session from the same ``self.user``.
+    """
+    session = serializers.BooleanField(required=False, default=False, write_only=True)
+
+    def validate(self, attrs):
+        self.session_requested = attrs.pop('session', False)
+        return super().validate(attrs)
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh in four queries: the user, the old token's row, its blacklisting, the new token.
+
+    The stock serializer looks the user up three times and runs a
+    get_or_create for each token row; see api.tokens for the blacklist check.
+    """
+    token_class = RotatingRefreshToken
+
+    def validate(self, attrs):
+        if not claims_on_use():
+            return super().validate(attrs)
+        refresh = self.token_class(attrs['refresh'])
+        user = None
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        data = {'access': str(refresh.access_token)}
+        jti, exp = refresh.payload[api_settings.JTI_CLAIM], refresh.payload['exp']
+        try:
+            with transaction.atomic():
+                refresh.claim()
+                refresh.set_jti()
+                refresh.set_exp()
+                refresh.set_iat()
+                refresh.outstand_for(user)
+        except IntegrityError:
+            remember_blacklisted(jti, exp)  # later replays stop at the cache
+            raise TokenError(_('Token is blacklisted'))
+        data['refresh'] = str(refresh)
+        return data
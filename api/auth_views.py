@@ -1,54 +1,62 @@
 from django.conf import settings
-from django.contrib.auth import get_user_model, logout
+from django.contrib.auth import get_user_model, login, logout
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.throttling import AnonRateThrottle
 from rest_framework.views import APIView
 
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import (
     TokenBlacklistView,
     TokenObtainPairView,
     TokenRefreshView,
 )
 
-from .auth_serializers import RegisterSerializer
-
-User = get_user_model()
+from books_market.outbox import enqueue_email
 
+from .auth_serializers import LoginSerializer, RegisterSerializer, RotatingTokenRefreshSerializer
+from .throttling import AuthThrottle
 
-class AuthThrottle(AnonRateThrottle):
-    rate = '20/hour'
-    scope = 'auth'
+User = get_user_model()
 
 
 class LoginView(TokenObtainPairView):
+    """Issue a JWT pair; with ``"session": true`` in the body also sign in to a Django session.
+
+    The built-in pages send ``session: true`` because the file views are
+    session-authenticated; API clients that only use the tokens skip the session write.
+    """
     throttle_classes = [AuthThrottle]
+    serializer_class = LoginSerializer
 
     def post(self, request, *args, **kwargs):
-        username = request.data.get("username")
-        password = request.data.get("password")
-        if username and password:
-            from django.contrib.auth import authenticate, login
-            user = authenticate(request, username=username, password=password)
-            if user:
-                login(request, user)
-        response = super().post(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        if serializer.session_requested:
+            # serializer.user came from authenticate(), so the password is not hashed again.
+            login(request, serializer.user)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
+    def handle_exception(self, exc):
+        response = super().handle_exception(exc)
         if response.status_code == status.HTTP_401_UNAUTHORIZED and response.data:
             data = dict(response.data)
             data['password_reset_available'] = True
             data['password_reset_endpoint'] = '/api/auth/password/reset/'
-            return Response(data, status=status.HTTP_401_UNAUTHORIZED)
+            response.data = data
         return response
 
 
 class TokenRefreshThrottleView(TokenRefreshView):
     throttle_classes = [AuthThrottle]
+    serializer_class = RotatingTokenRefreshSerializer
 
 
 class LogoutView(TokenBlacklistView):
@@ -105,13 +113,8 @@ class PasswordResetRequestView(APIView):
             reset_url = f"{settings.FRONTEND_RESET_URL}?uid={uid}&token={token}"
             subject = render_to_string('email/password_reset_subject.txt').strip()
             body = render_to_string('email/password_reset_body.txt', {'reset_url': reset_url})
-            send_mail(
-                subject=subject,
-                message=body,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
+            # Queued, not sent: SMTP latency and failures stay out of the request (see run_outbox).
+            enqueue_email(subject, body, [user.email])
         return Response(
             {'detail': 'If an account with this email exists, you will receive an email with instructions.'},
             status=status.HTTP_200_OK,
@@ -0,0 +1,58 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from books_market.catalogue import catalogue_version
+
+
+class CatalogueCacheMixin:
+    """Caches serialized ``list``/``retrieve`` data of read-only catalogue viewsets.
+
+    Entries are keyed by catalogue version, scheme and host (the data holds
+    absolute URLs), path, query string and whether the user is authenticated
+    (``file_url`` is only shown to signed-in users), so any catalogue change
+    invalidates them. Responses carry an ETag derived from
+    the same key; a matching ``If-None-Match`` gets a 304 without touching the
+    database.
+    """
+    response_cache_prefix = 'api:catalogue'
+
+    def get_response_cache_key(self, request):
+        auth = 'auth' if request.user.is_authenticated else 'anon'
+        return ':'.join([
+            self.response_cache_prefix,
+            f'v{catalogue_version()}',
+            auth,
+            f'{request.scheme}://{request.get_host()}',
+            request.path,
+            request.META.get('QUERY_STRING', ''),
+        ])
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response.data, settings.CATALOGUE_CACHE_TIMEOUT)
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
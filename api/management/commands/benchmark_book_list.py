@@ -0,0 +1,68 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import BookListRowSerializer, BookListSerializer
+from books_market.models import Book, Category
+from books_market.thumbnails import thumbnail_widths
+
+
+class Command(BaseCommand):
+    help = (
+        "Time BookListSerializer against the BookListRowSerializer fast path on the "
+        "same in-memory books (no database access). Every other book has a cover with "
+        "recorded thumbnails, so image and thumbnail URLs are built as in production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Books per serialization (default 1000).')
+        parser.add_argument('--repeat', type=int, default=20, help='Serializations per variant; the best is kept.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if rows < 1 or repeat < 1:
+            raise CommandError("--rows and --repeat must be positive.")
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        request = APIRequestFactory().get('/api/books/', HTTP_HOST=host)
+        # Signed in, so file_url is built for every row.
+        request.user = get_user_model()(username='benchmark')
+        context = {'request': request}
+        category = Category(pk=1, title='Benchmark', slug='benchmark')
+        widths = list(thumbnail_widths())
+        books = [
+            Book(pk=i, title=f'Book {i}', slug=f'book-{i}', author='Author', published_date=date(2020, 1, 1),
+                 category=category, file=f'books/files/book-{i}.pdf',
+                 image=f'books/covers/book-{i}.jpg' if i % 2 == 0 else '',
+                 cover_thumbnails=widths if i % 2 == 0 else [])
+            for i in range(rows)
+        ]
+        values = [
+            {'id': b.pk, 'slug': b.slug, 'title': b.title, 'author': b.author,
+             'published_date': b.published_date, 'category__slug': category.slug,
+             'category__title': category.title, 'image': b.image.name, 'cover_thumbnails': b.cover_thumbnails,
+             'file': b.file.name}
+            for b in books
+        ]
+        variants = [
+            ('BookListSerializer', lambda: BookListSerializer(books, many=True, context=context).data),
+            ('BookListRowSerializer', lambda: BookListRowSerializer(values, many=True, context=context).data),
+        ]
+        if variants[0][1]() != variants[1][1]():
+            raise CommandError("The serializers disagree; fix BookListRowSerializer before benchmarking.")
+        timings = {}
+        for name, run in variants:
+            best = min(self._time(run) for _ in range(repeat))
+            timings[name] = best
+            self.stdout.write(f"{name}: {best * 1000:.2f} ms per {rows} rows ({best / rows * 1e6:.1f} us/row)")
+        speedup = timings['BookListSerializer'] / timings['BookListRowSerializer']
+        self.stdout.write(self.style.SUCCESS(f"Fast path is {speedup:.1f}x faster."))
+
+    @staticmethod
+    def _time(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
@@ -0,0 +1,82 @@
+import statistics
+import time
+from unittest import mock
+
+from django.contrib.auth import authenticate, get_user_model, login
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIRequestFactory
+
+from api.auth_views import LoginView
+
+PASSWORD = 'Benchmark-Pass-123'
+
+
+class BenchmarkLoginView(LoginView):
+    throttle_classes = []
+
+
+class PreviousLoginView(BenchmarkLoginView):
+    """The login flow before sessions became opt-in: authenticate() and login(), then the serializer again."""
+
+    def post(self, request, *args, **kwargs):
+        user = authenticate(request, username=request.data['username'], password=request.data['password'])
+        if user:
+            login(request, user)
+        return super().post(request, *args, **kwargs)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time POST /api/auth/token/ on a throwaway test database with the configured password "
+        "hasher: the previous double-authenticating flow against token-only and token+session logins."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Logins per variant (default 20).')
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        if runs < 1:
+            raise CommandError("--runs must be positive.")
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            get_user_model().objects.create_user('benchmark', 'benchmark@example.com', PASSWORD)
+            variants = [
+                ('previous (session, two hash checks)', PreviousLoginView, {}),
+                ('token only', BenchmarkLoginView, {}),
+                ('token + session', BenchmarkLoginView, {'session': True}),
+            ]
+            results = [(name, *self._measure(view, extra, runs)) for name, view, extra in variants]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        hasher = get_hasher().algorithm
+        for name, median, checks in results:
+            self.stdout.write(f"{name}: {median:.1f} ms median, {checks:g} {hasher} check(s) per login")
+        saving = 1 - results[2][1] / results[0][1]
+        self.stdout.write(self.style.SUCCESS(f"Login with a session is {saving:.0%} faster than before."))
+
+    @staticmethod
+    def _measure(view_class, extra, runs):
+        view = view_class.as_view()
+        factory = APIRequestFactory()
+        hasher_class = type(get_hasher())
+        timings = []
+        with mock.patch.object(hasher_class, 'verify', autospec=True, side_effect=hasher_class.verify) as verify:
+            for _ in range(runs):
+                request = factory.post(
+                    '/api/auth/token/', {'username': 'benchmark', 'password': PASSWORD, **extra}, format='json',
+                )
+                request.session = SessionStore()
+                started = time.perf_counter()
+                response = view(request)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f"{view_class.__name__} returned {response.status_code}.")
+        return statistics.median(timings), verify.call_count / runs
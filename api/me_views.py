@@ -1,21 +1,43 @@
+from django.db.models import Exists, OuterRef
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from books_market.counts import cached_count, favorites_count_key, reads_count_key
 from books_market.models import Book, BookFavorite, BookRead
-from .serializers import BookListSerializer
+from .pagination import KeysetPagination
+from .serializers import BookListRowSerializer, book_list_values
+
+BOOK_STATE_BATCH_LIMIT = 100
+
+
+def _book_state_queryset(user):
+    """Books annotated with the user's favorite/read flags (indexed EXISTS subqueries)."""
+    return Book.objects.annotate(
+        in_favorites=Exists(BookFavorite.objects.filter(user=user, book=OuterRef('pk'))),
+        in_read=Exists(BookRead.objects.filter(user=user, book=OuterRef('pk'))),
+    ).values('slug', 'in_favorites', 'in_read')
 
 
 class FavoritesListCreateView(APIView):
+    """Favorites, newest first, keyset-paginated on (created_at, id)."""
     permission_classes = [IsAuthenticated]
 
+    def get_cached_count(self):
+        user = self.request.user
+        return cached_count(favorites_count_key(user.pk), BookFavorite.objects.filter(user=user))
+
     def get(self, request):
-        qs = Book.objects.filter(
-            favorited_by__user=request.user
-        ).select_related('category', 'language').distinct().order_by('-favorited_by__created_at')
-        serializer = BookListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        qs = book_list_values(
+            BookFavorite.objects.filter(user=request.user), prefix='book__', extra=('id', 'created_at'),
+        )
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = BookListRowSerializer(
+            page, many=True, prefix='book__', context={'request': request}
+        )
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         book_slug = request.data.get('book_slug')
@@ -53,14 +75,23 @@ class FavoritesDestroyView(APIView):
 
 
 class ReadListCreateView(APIView):
+    """Read list, most recent first, keyset-paginated on (read_at, id)."""
     permission_classes = [IsAuthenticated]
 
+    def get_cached_count(self):
+        user = self.request.user
+        return cached_count(reads_count_key(user.pk), BookRead.objects.filter(user=user))
+
     def get(self, request):
-        qs = Book.objects.filter(
-            read_by__user=request.user
-        ).select_related('category', 'language').distinct().order_by('-read_by__read_at')
-        serializer = BookListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        qs = book_list_values(
+            BookRead.objects.filter(user=request.user), prefix='book__', extra=('id', 'read_at'),
+        )
+        paginator = KeysetPagination(ordering=('-read_at', '-id'))
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = BookListRowSerializer(
+            page, many=True, prefix='book__', context={'request': request}
+        )
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         book_slug = request.data.get('book_slug')
@@ -95,3 +126,38 @@ class ReadDestroyView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class BookStateView(APIView):
+    """Whether one book is in the user's favorites and read list."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, book_slug):
+        state = _book_state_queryset(request.user).filter(slug=book_slug).first()
+        if not state:
+            return Response(
+                {'detail': 'Book not found.'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(state)
+
+
+class BookStateBatchView(APIView):
+    """Favorite/read flags for many books at once: ?slugs=a,b,c (unknown slugs are omitted)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        raw = request.query_params.get('slugs', '')
+        slugs = list(dict.fromkeys(s.strip() for s in raw.split(',') if s.strip()))
+        if not slugs:
+            return Response(
+                {'detail': 'slugs is required.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(slugs) > BOOK_STATE_BATCH_LIMIT:
+            return Response(
+                {'detail': f'At most {BOOK_STATE_BATCH_LIMIT} slugs per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        states = _book_state_queryset(request.user).filter(slug__in=slugs)
+        return Response({state.pop('slug'): state for state in states})
@@ -0,0 +1,53 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from books_market.pagination import InvalidCursor, keyset_paginate
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on a total ordering, e.g. ``('title', 'id')``.
+
+    The ordering comes from the constructor or the view's ``keyset_ordering``.
+    ``count`` is taken from the view's ``get_cached_count()`` when it has one,
+    so no page ever runs COUNT(*) against the table.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+
+    def __init__(self, ordering=None):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.ordering or getattr(view, 'keyset_ordering', ('id',))
+        try:
+            self.page = keyset_paginate(
+                queryset,
+                ordering,
+                cursor=request.query_params.get(self.cursor_query_param),
+                page_size=self.page_size,
+            )
+        except InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        get_count = getattr(view, 'get_cached_count', None)
+        self.count = get_count() if get_count else None
+        return self.page.object_list
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.previous_cursor),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
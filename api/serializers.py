@@ -1,6 +1,19 @@
+from django.urls import reverse
+from django.utils.functional import cached_property
 from rest_framework import serializers
 
 from books_market.models import Category, Language, Book
+from books_market.thumbnails import thumbnail_url
+
+# Cover rendition exposed as thumbnail_url on list endpoints.
+LIST_THUMBNAIL_WIDTH = 400
+
+# Columns read by BookListRowSerializer; "id" is only there for keyset cursors.
+BOOK_LIST_COLUMNS = (
+    'id', 'slug', 'title', 'author', 'published_date',
+    'category__slug', 'category__title', 'image', 'cover_thumbnails', 'file',
+)
+_SLUG_PLACEHOLDER = '__slug__'
 
 
 def _absolute_uri(request, url):
@@ -13,7 +26,6 @@ def _protected_book_file_url(request, book):
     """URL for reading the book file (protected endpoint); authenticated users only."""
     if not request or not request.user.is_authenticated or not book or not book.file:
         return None
-    from django.urls import reverse
     return request.build_absolute_uri(reverse("book_read", kwargs={"slug": book.slug}))
 
 
@@ -24,8 +36,6 @@ class LanguageSerializer(serializers.ModelSerializer):
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    book_count = serializers.IntegerField(read_only=True, required=False)
-
     class Meta:
         model = Category
         fields = ['slug', 'title', 'description', 'book_count']
@@ -35,6 +45,7 @@ class BookListSerializer(serializers.ModelSerializer):
     category_slug = serializers.SlugRelatedField(source='category', slug_field='slug', read_only=True)
     category_title = serializers.CharField(source='category.title', read_only=True)
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -42,7 +53,7 @@ class BookListSerializer(serializers.ModelSerializer):
         fields = [
             'slug', 'title', 'author', 'published_date',
             'category_slug', 'category_title',
-            'image_url', 'file_url',
+            'image_url', 'thumbnail_url', 'file_url',
         ]
 
     def get_image_url(self, obj):
@@ -51,11 +62,77 @@ class BookListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         return _absolute_uri(request, obj.image.url)
 
+    def get_thumbnail_url(self, obj):
+        if not obj.image:
+            return None
+        request = self.context.get('request')
+        return _absolute_uri(request, thumbnail_url(obj.image, LIST_THUMBNAIL_WIDTH, 'webp', obj.cover_thumbnails))
+
     def get_file_url(self, obj):
         request = self.context.get("request")
         return _protected_book_file_url(request, obj)
 
 
+def book_list_values(queryset, prefix='', extra=()):
+    """``.values()`` rows for ``BookListRowSerializer``; ``prefix`` reaches the book through a relation."""
+    return queryset.values(*extra, *(prefix + column for column in BOOK_LIST_COLUMNS))
+
+
+class BookListRowSerializer(serializers.BaseSerializer):
+    """Read-only fast path with the same output as ``BookListSerializer``.
+
+    Works on ``book_list_values()`` rows instead of model instances and builds
+    each dict directly. The site origin and the ``book_read`` URL are resolved
+    once per serializer rather than once per row.
+    """
+
+    def __init__(self, *args, prefix='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prefix = prefix
+        self._image_field = Book._meta.get_field('image')
+
+    @cached_property
+    def _urls(self):
+        request = self.context.get('request')
+        origin = request.build_absolute_uri('/')[:-1] if request else ''
+        read_url = None
+        if request and request.user.is_authenticated:
+            path = reverse('book_read', kwargs={'slug': _SLUG_PLACEHOLDER})
+            read_url = tuple((origin + path).split(_SLUG_PLACEHOLDER))
+        return origin, read_url
+
+    def _absolute(self, url, origin):
+        if origin and url.startswith('/') and not url.startswith('//'):
+            return origin + url
+        return url
+
+    def to_representation(self, row):
+        p = self.prefix
+        origin, read_url = self._urls
+        slug = row[p + 'slug']
+        published = row[p + 'published_date']
+        image_url = thumb_url = file_url = None
+        if row[p + 'image']:
+            image = self._image_field.attr_class(None, self._image_field, row[p + 'image'])
+            image_url = self._absolute(image.url, origin)
+            thumb_url = self._absolute(
+                thumbnail_url(image, LIST_THUMBNAIL_WIDTH, 'webp', row[p + 'cover_thumbnails']), origin,
+            )
+        if read_url and row[p + 'file']:
+            file_url = f'{read_url[0]}{slug}{read_url[1]}'
+        return {
+            'slug': slug,
+            'title': row[p + 'title'],
+            'author': row[p + 'author'],
+            'published_date': published.isoformat() if published else None,
+            'category_slug': row[p + 'category__slug'],
+            'category_title': row[p + 'category__title'],
+            'image_url': image_url,
+            'thumbnail_url': thumb_url,
+            'file_url': file_url,
+        }
+
+
 class BookDetailSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     language = LanguageSerializer(read_only=True)
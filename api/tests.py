@@ -1,10 +1,31 @@
-from datetime import date
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from books_market.models import Category, Language, Book
+from books_market.exporter import aiter_book_batches, iter_book_rows
+from books_market.models import Category, Language, Book, BookFavorite, BookRead, OutgoingEmail
+from .serializers import BookListRowSerializer, BookListSerializer, book_list_values
+from .throttling import AnonRateThrottle, SQLiteThrottleStore, check_shared_throttle_store, get_throttle_store
 
 User = get_user_model()
 
@@ -12,6 +33,9 @@ VALID_PASSWORD = "TestPass123!"
 
 
 class CategoryAPITests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_category_list_returns_200_and_list(self):
         Category.objects.create(title="Cat", slug="cat", description="D")
         response = self.client.get("/api/categories/")
@@ -40,6 +64,9 @@ class BookAPITests(APITestCase):
             title="Other", slug="other", description="Other"
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_book_list_returns_200_and_list(self):
         Book.objects.create(
             title="Book One",
@@ -79,6 +106,49 @@ class BookAPITests(APITestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["slug"], "tech-book")
 
+    def test_book_list_search_filter(self):
+        Book.objects.create(
+            title="Learning Rust",
+            slug="learning-rust",
+            author="A",
+            description="D",
+            published_date=date(2020, 1, 1),
+            category=self.category,
+        )
+        Book.objects.create(
+            title="Go in Action",
+            slug="go-in-action",
+            author="Rusty Writer",
+            description="D",
+            published_date=date(2020, 1, 1),
+            category=self.other_category,
+        )
+        response = self.client.get("/api/books/?search=rust")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data.get("results", response.data)
+        self.assertEqual([b["slug"] for b in data], ["learning-rust", "go-in-action"])
+        response = self.client.get("/api/books/?search=rust&category=other")
+        data = response.data.get("results", response.data)
+        self.assertEqual([b["slug"] for b in data], ["go-in-action"])
+
+    def test_book_list_cursor_pagination_is_opt_in(self):
+        for i in range(21):
+            Book.objects.create(
+                title=f"Title {i:02d}", slug=f"title-{i:02d}", author="A", description="D",
+                published_date=date(2020, 1, 1), category=self.category,
+            )
+        paged = self.client.get("/api/books/?category=tech")
+        self.assertIn("count", paged.data)
+        first = self.client.get("/api/books/?category=tech&cursor=")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["count"], 21)
+        self.assertEqual(first.data["results"][0]["slug"], "title-00")
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        self.assertEqual([b["slug"] for b in second.data["results"]], ["title-20"])
+        bad = self.client.get("/api/books/?cursor=not-a-cursor")
+        self.assertEqual(bad.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_book_detail_by_slug_returns_200(self):
         Book.objects.create(
             title="Detail Book",
@@ -97,6 +167,58 @@ class BookAPITests(APITestCase):
         self.assertIn("file_url", response.data)
 
 
+class CatalogueCacheAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Tech", slug="tech", description="D")
+        cls.book = Book.objects.create(
+            title="Cached", slug="cached", author="A", description="D",
+            published_date=date(2020, 1, 1), category=cls.category,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get("/api/books/")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/books/")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_catalogue_change_invalidates(self):
+        first = self.client.get("/api/books/cached/")
+        self.book.title = "Renamed"
+        self.book.save()
+        second = self.client.get("/api/books/cached/")
+        self.assertEqual(second.data["title"], "Renamed")
+        self.assertNotEqual(second["ETag"], first["ETag"])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/api/categories/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/categories/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_anonymous_and_authenticated_are_cached_separately(self):
+        user = User.objects.create_user(
+            username="cacheuser", email="c@example.com", password=VALID_PASSWORD
+        )
+        anon = self.client.get("/api/books/")
+        self.client.force_authenticate(user)
+        auth = self.client.get("/api/books/")
+        self.assertNotEqual(anon["ETag"], auth["ETag"])
+
+    def test_http_and_https_are_cached_separately(self):
+        Book.objects.filter(pk=self.book.pk).update(image="books/covers/cached.jpg")
+        plain = self.client.get("/api/books/cached/")
+        secure = self.client.get("/api/books/cached/", secure=True)
+        self.assertTrue(plain.data["image_url"].startswith("http://"))
+        self.assertTrue(secure.data["image_url"].startswith("https://"))
+        self.assertNotEqual(plain["ETag"], secure["ETag"])
+
+
 class RegisterAPITests(APITestCase):
     def test_register_success_returns_201(self):
         payload = {
@@ -139,6 +261,175 @@ class RegisterAPITests(APITestCase):
         self.assertIn("password_confirm", response2.data)
 
 
+class LoginAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", password=VALID_PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, **extra):
+        return self.client.post(
+            "/api/auth/token/", {"username": "reader", "password": VALID_PASSWORD, **extra}, format="json",
+        )
+
+    def test_password_is_checked_once_and_session_is_opt_in(self):
+        hasher_class = type(get_hasher())
+        with mock.patch.object(hasher_class, "verify", autospec=True, side_effect=hasher_class.verify) as verify:
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {"access", "refresh"})
+        self.assertEqual(verify.call_count, 1)
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+        with mock.patch.object(hasher_class, "verify", autospec=True, side_effect=hasher_class.verify) as verify:
+            response = self.login(session=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(self.client.session["_auth_user_id"], str(self.user.pk))
+
+    def test_wrong_password_returns_401_with_reset_hint(self):
+        response = self.client.post(
+            "/api/auth/token/", {"username": "reader", "password": "wrong", "session": True}, format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(response.data["password_reset_available"])
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+
+class PasswordResetAPITests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reset_request_only_queues_the_email(self):
+        User.objects.create_user(username="forgetful", email="f@example.com", password=VALID_PASSWORD)
+        with self.assertNumQueries(2):
+            response = self.client.post("/api/auth/password/reset/", {"email": "F@example.com"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mail.outbox, [])
+        queued = OutgoingEmail.objects.get()
+        self.assertEqual(queued.to, ["f@example.com"])
+        self.assertIn("?uid=", queued.body)
+        call_command("run_outbox", "--once", stdout=io.StringIO())
+        self.assertEqual(mail.outbox[0].body, queued.body)
+
+    def test_unknown_email_queues_nothing(self):
+        response = self.client.post("/api/auth/password/reset/", {"email": "nobody@example.com"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+
+class ThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.clock = 600.0  # the start of a one-minute window
+
+    def throttle(self, rate="4/min"):
+        throttle_class = type("TestThrottle", (AnonRateThrottle,), {"rate": rate, "timer": lambda _: self.clock})
+        return throttle_class()
+
+    def request(self):
+        request = self.factory.get("/api/books/")
+        request.user = AnonymousUser()
+        return request
+
+    def hits(self, count, throttle=None):
+        throttle = throttle or self.throttle()
+        return [throttle.allow_request(self.request(), None) for _ in range(count)]
+
+    def test_sliding_window_weighs_the_previous_window(self):
+        self.assertEqual(self.hits(5), [True] * 4 + [False])
+        self.clock += 75  # a quarter into the next window: 4 * 0.75 = 3 still count
+        throttle = self.throttle()
+        self.assertEqual(self.hits(2, throttle), [True, False])
+        self.assertAlmostEqual(throttle.wait(), 15)
+
+    @override_settings(THROTTLE_WINDOW="fixed")
+    def test_fixed_window_resets_at_the_boundary(self):
+        self.assertEqual(self.hits(5), [True] * 4 + [False])
+        self.clock += 60
+        self.assertEqual(self.hits(5), [True] * 4 + [False])
+
+    def test_throttled_requests_are_not_counted(self):
+        self.hits(10)
+        self.assertEqual(cache.get("throttle_anon_127.0.0.1:10"), 4)
+
+    @override_settings(DEBUG=False, THROTTLE_STORE="api.throttling.CacheThrottleStore")
+    def test_deploy_check_warns_about_per_process_counters(self):
+        self.assertEqual([w.id for w in check_shared_throttle_store(None)], ["api.W001"])
+        with override_settings(THROTTLE_STORE="api.throttling.SQLiteThrottleStore"):
+            self.assertEqual(check_shared_throttle_store(None), [])
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}):
+            self.assertEqual(check_shared_throttle_store(None), [])
+
+    def test_sqlite_store_is_shared_between_processes(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "throttle.sqlite3")
+        first, second = SQLiteThrottleStore(path), SQLiteThrottleStore(path)
+        self.assertEqual(first.hit("k", 10, ttl=120), (0, 1))
+        self.assertEqual(second.hit("k", 10, ttl=120), (0, 2))
+        second.undo("k", 10)
+        self.assertEqual(first.hit("k", 11, ttl=120), (1, 1))
+        with override_settings(THROTTLE_STORE="api.throttling.SQLiteThrottleStore", THROTTLE_SQLITE_PATH=path):
+            get_throttle_store().clear()
+            self.assertEqual(self.hits(5), [True] * 4 + [False])
+            self.assertEqual(cache.get("throttle_anon_127.0.0.1:10"), None)
+
+
+class TokenRefreshAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="rotor", password=VALID_PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+        self.refresh = str(RefreshToken.for_user(self.user))
+
+    def refresh_with(self, token):
+        # The recent-blacklist cache is filled on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/auth/token/refresh/", {"refresh": token}, format="json")
+
+    def test_rotation_blacklists_the_old_token(self):
+        with self.assertNumQueries(6):  # user, old token, blacklist, new token + savepoint pair
+            response = self.refresh_with(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data["refresh"], self.refresh)
+        self.assertTrue(BlacklistedToken.objects.filter(token__token=self.refresh).exists())
+        self.assertTrue(OutstandingToken.objects.filter(token=response.data["refresh"], user=self.user).exists())
+        self.assertEqual(self.refresh_with(response.data["refresh"]).status_code, status.HTTP_200_OK)
+
+    def test_replay_is_rejected_by_the_cache_then_by_the_database(self):
+        self.assertEqual(self.refresh_with(self.refresh).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh_with(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        cache.clear()
+        self.assertEqual(self.refresh_with(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_logged_out_token_cannot_refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/auth/logout/", {"refresh": self.refresh}, format="json")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh_with(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune_tokens_deletes_expired_rows_in_batches(self):
+        self.refresh_with(self.refresh)  # blacklists self.refresh, issues a rotated token
+        kept, *expiring = (str(RefreshToken.for_user(self.user)) for _ in range(3))
+        OutstandingToken.objects.filter(token__in=[self.refresh, *expiring]).update(
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        out = io.StringIO()
+        call_command("prune_tokens", "--batch-size", "1", stdout=out)
+        self.assertIn("Deleted 3 outstanding and 1 blacklisted token(s).", out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertTrue(OutstandingToken.objects.filter(token=kept).exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
 class CurrentUserAPITests(APITestCase):
     def test_me_401_without_token_200_with_token(self):
         r_anon = self.client.get("/api/auth/me/")
@@ -188,8 +479,37 @@ class FavoritesAPITests(APITestCase):
         self.assertEqual(post_resp.status_code, status.HTTP_201_CREATED)
         get_resp = self.client.get("/api/me/favorites/")
         self.assertEqual(get_resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(get_resp.data), 1)
-        self.assertEqual(get_resp.data[0]["slug"], "fav-book")
+        self.assertEqual(get_resp.data["count"], 1)
+        self.assertEqual(len(get_resp.data["results"]), 1)
+        self.assertEqual(get_resp.data["results"][0]["slug"], "fav-book")
+        self.assertIsNone(get_resp.data["next"])
+
+    def test_favorites_list_is_keyset_paginated_newest_first(self):
+        user = User.objects.create_user(
+            username="heavy", email="h@example.com", password=VALID_PASSWORD
+        )
+        cat = Category.objects.create(title="C", slug="c", description="D")
+        for i in range(25):
+            book = Book.objects.create(
+                title=f"Book {i:02d}", slug=f"book-{i:02d}", author="A", description="D",
+                published_date=date(2020, 1, 1), category=cat,
+            )
+            BookFavorite.objects.create(user=user, book=book)
+        self.client.force_authenticate(user)
+        first = self.client.get("/api/me/favorites/")
+        self.assertEqual(first.data["count"], 25)
+        self.assertEqual(len(first.data["results"]), 20)
+        self.assertEqual(first.data["results"][0]["slug"], "book-24")
+        second = self.client.get(first.data["next"])
+        self.assertEqual(
+            [b["slug"] for b in second.data["results"]],
+            ["book-04", "book-03", "book-02", "book-01", "book-00"],
+        )
+        self.assertIsNone(second.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.client.delete("/api/me/favorites/book-00/")
+        self.assertEqual(self.client.get("/api/me/favorites/").data["count"], 24)
 
 
 class ReadAPITests(APITestCase):
@@ -222,3 +542,138 @@ class ReadAPITests(APITestCase):
         self.assertEqual(del_resp.status_code, status.HTTP_204_NO_CONTENT)
         del_again = self.client.delete("/api/me/read/read-book/")
         self.assertEqual(del_again.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookStateAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="stateuser", email="s@example.com", password=VALID_PASSWORD
+        )
+        cat = Category.objects.create(title="C", slug="c", description="D")
+        cls.fav = Book.objects.create(
+            title="Fav", slug="fav", author="A", description="D",
+            published_date=date(2020, 1, 1), category=cat,
+        )
+        cls.plain = Book.objects.create(
+            title="Plain", slug="plain", author="A", description="D",
+            published_date=date(2020, 1, 1), category=cat,
+        )
+        BookFavorite.objects.create(user=cls.user, book=cls.fav)
+        BookRead.objects.create(user=cls.user, book=cls.plain)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_single_book_state(self):
+        response = self.client.get("/api/me/books/fav/state/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, {"slug": "fav", "in_favorites": True, "in_read": False}
+        )
+        missing = self.client.get("/api/me/books/nope/state/")
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_batch_book_state_is_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/me/books/state/?slugs=fav,plain,nope")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            "fav": {"in_favorites": True, "in_read": False},
+            "plain": {"in_favorites": False, "in_read": True},
+        })
+        self.assertEqual(
+            self.client.get("/api/me/books/state/").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class BookExportAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="exporter", email="e@example.com", password=VALID_PASSWORD
+        )
+        cat = Category.objects.create(title="Tech", slug="tech", description="D")
+        lang = Language.objects.create(code="en", name="English")
+        for i in range(5):
+            Book.objects.create(
+                title=f"Book {i}", slug=f"book-{i}", author="A, B", description="Line\nbreak",
+                published_date=date(2020, 1, i + 1), category=cat, language=lang,
+            )
+
+    def _content(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_requires_authentication(self):
+        response = self.client.get("/api/books/export/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ndjson_export_streams_keyset_batches(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/books/export/")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([r["slug"] for r in rows], [f"book-{i}" for i in range(5)])
+        self.assertEqual(rows[0]["published_date"], "2020-01-01")
+        self.assertEqual(rows[0]["category"], "Tech")
+        self.assertEqual(rows[0]["language"], "en")
+        with self.assertNumQueries(3):
+            batched = list(iter_book_rows(batch_size=2))
+        self.assertEqual([r["slug"] for r in batched], [r["slug"] for r in rows])
+
+    def test_csv_export(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/books/export/?type=csv&category=tech")
+        rows = list(csv.DictReader(io.StringIO(self._content(response))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[4]["author"], "A, B")
+        self.assertEqual(rows[4]["description"], "Line\nbreak")
+        bad = self.client.get("/api/books/export/?type=xml")
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_asgi_export_streams_an_async_iterator(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await AsyncClient().get(
+            "/api/books/export/?type=csv", headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([r["slug"] for r in rows], [f"book-{i}" for i in range(5)])
+        batches = [batch async for batch in aiter_book_batches(batch_size=2)]
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+
+class BookListRowSerializerTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="rowuser", email="r@example.com", password=VALID_PASSWORD
+        )
+        cat = Category.objects.create(title="Tech", slug="tech", description="D")
+        Book.objects.create(
+            title="With File", slug="with-file", author="A", description="D",
+            published_date=date(2020, 1, 1), category=cat, file="books/files/f.pdf",
+        )
+        Book.objects.create(
+            title="Plain", slug="plain", author="B", description="D",
+            published_date=date(2021, 2, 3), category=cat,
+        )
+
+    def test_matches_model_serializer(self):
+        factory = APIRequestFactory()
+        books = Book.objects.select_related("category").order_by("title", "id")
+        for user in (AnonymousUser(), self.user):
+            request = factory.get("/api/books/")
+            request.user = user
+            context = {"request": request}
+            self.assertEqual(
+                BookListRowSerializer(book_list_values(books), many=True, context=context).data,
+                BookListSerializer(books, many=True, context=context).data,
+            )
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command("benchmark_book_list", "--rows", "5", "--repeat", "1", stdout=out)
+        self.assertIn("faster", out.getvalue())
@@ -0,0 +1,221 @@
+"""Rate throttles backed by window counters in a pluggable shared store.
+
+DRF's ``SimpleRateThrottle`` keeps every request timestamp of the last
+period in the cache and rewrites the whole list on each request, so its
+state and the cost of each request grow with the rate. These throttles keep
+one counter per key and window instead. The ``sliding`` estimate (the
+default, ``THROTTLE_WINDOW``) adds the previous window's count, weighted by
+how much of it still overlaps the last ``duration`` seconds, to the current
+one. ``fixed`` uses the current window alone. A key therefore needs at most
+two small counters, whatever the rate. Throttled requests are not counted,
+the same as in DRF.
+
+The counters live in the store named by ``THROTTLE_STORE``:
+
+* ``CacheThrottleStore`` uses the default cache's atomic ``incr``. Limits are
+  shared between processes when the cache is (Redis, Memcached).
+* ``SQLiteThrottleStore`` keeps the counters in a local SQLite file
+  (``THROTTLE_SQLITE_PATH``), so every worker on one host shares them
+  without running a cache server.
+
+``manage.py check --deploy`` warns (api.W001) when ``CacheThrottleStore``
+sits on the per-process local-memory cache with ``DEBUG`` off.
+"""
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Tags, Warning, register
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+
+DEFAULT_STORE = 'api.throttling.CacheThrottleStore'
+SLIDING, FIXED = 'sliding', 'fixed'
+
+
+class ThrottleStore:
+    """Counters keyed by ``(key, window)``, where ``window`` is the window's number since the epoch."""
+
+    def hit(self, key, window, ttl):
+        """Count one request in ``window``; returns ``(previous window's count, this window's count)``."""
+        raise NotImplementedError
+
+    def undo(self, key, window):
+        """Take back a ``hit`` that was then throttled."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class CacheThrottleStore(ThrottleStore):
+    """Counters in the default cache, expiring ``ttl`` seconds after their window opens."""
+
+    def hit(self, key, window, ttl):
+        current_key = f'{key}:{window}'
+        try:
+            current = cache.incr(current_key)
+        except ValueError:  # first request in this window
+            current = 1 if cache.add(current_key, 1, ttl) else cache.incr(current_key)
+        return cache.get(f'{key}:{window - 1}', 0), current
+
+    def undo(self, key, window):
+        try:
+            cache.decr(f'{key}:{window}')
+        except ValueError:
+            pass
+
+    def clear(self):
+        cache.clear()
+
+
+class SQLiteThrottleStore(ThrottleStore):
+    """Counters in a SQLite file shared by every process on the host.
+
+    Each hit is one upsert in WAL mode, so readers never wait and writers
+    queue for a few microseconds at most. Rows of windows that have passed
+    are deleted every ``PURGE_INTERVAL`` seconds.
+    """
+    PURGE_INTERVAL = 60
+    BUSY_TIMEOUT = 5
+
+    def __init__(self, path=None):
+        self.path = str(path or getattr(settings, 'THROTTLE_SQLITE_PATH', settings.BASE_DIR / 'throttle.sqlite3'))
+        self._local = threading.local()
+        self._next_purge = 0
+
+    def _connection(self):
+        # sqlite3 connections may not cross threads; each thread opens its own.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS throttle_counter ('
+                ' key TEXT NOT NULL, window INTEGER NOT NULL, hits INTEGER NOT NULL, expires REAL NOT NULL,'
+                ' PRIMARY KEY (key, window)) WITHOUT ROWID'
+            )
+            self._local.connection = connection
+        return connection
+
+    def hit(self, key, window, ttl):
+        connection = self._connection()
+        now = time.time()
+        (current,) = connection.execute(
+            'INSERT INTO throttle_counter (key, window, hits, expires) VALUES (?, ?, 1, ?)'
+            ' ON CONFLICT (key, window) DO UPDATE SET hits = hits + 1 RETURNING hits',
+            (key, window, now + ttl),
+        ).fetchone()
+        row = connection.execute(
+            'SELECT hits FROM throttle_counter WHERE key = ? AND window = ?', (key, window - 1),
+        ).fetchone()
+        if now >= self._next_purge:
+            self._next_purge = now + self.PURGE_INTERVAL
+            connection.execute('DELETE FROM throttle_counter WHERE expires < ?', (now,))
+        return (row[0] if row else 0), current
+
+    def undo(self, key, window):
+        self._connection().execute(
+            'UPDATE throttle_counter SET hits = hits - 1 WHERE key = ? AND window = ? AND hits > 0', (key, window),
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM throttle_counter')
+
+
+_stores = {}
+
+
+def get_throttle_store():
+    """The ``THROTTLE_STORE`` instance, shared by every throttle in the process."""
+    path = getattr(settings, 'THROTTLE_STORE', None) or DEFAULT_STORE
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = import_string(path)()
+    return store
+
+
+@receiver(setting_changed, dispatch_uid='api_throttle_store_reset')
+def reset_throttle_store(setting, **kwargs):
+    if setting in ('THROTTLE_STORE', 'THROTTLE_SQLITE_PATH'):
+        _stores.clear()
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_throttle_store(app_configs, **kwargs):
+    """Throttle counters in a per-process cache give each worker its own limit."""
+    if settings.DEBUG:
+        return []
+    store = import_string(getattr(settings, 'THROTTLE_STORE', None) or DEFAULT_STORE)
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if not issubclass(store, CacheThrottleStore) or backend != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Warning(
+        "Throttle counters are in the local-memory cache, so every worker process enforces its own limits.",
+        hint=(
+            "Set THROTTLE_STORE=api.throttling.SQLiteThrottleStore on a single host, "
+            "or a shared DJANGO_CACHE_BACKEND such as Redis."
+        ),
+        id='api.W001',
+    )]
+
+
+class WindowRateThrottleMixin:
+    """``allow_request``/``wait`` for a ``SimpleRateThrottle`` on window counters instead of a history list."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        store = get_throttle_store()
+        self.previous, self.current = store.hit(self.key, window, ttl=2 * self.duration)
+        if self.estimate(self.previous, self.current) <= self.num_requests:
+            return True
+        store.undo(self.key, window)
+        self.current -= 1
+        return self.throttle_failure()
+
+    def sliding(self):
+        return getattr(settings, 'THROTTLE_WINDOW', SLIDING) != FIXED
+
+    def estimate(self, previous, current, elapsed=None):
+        """Requests in the last ``duration`` seconds, ``elapsed`` seconds into the current window."""
+        if not self.sliding():
+            return current
+        if elapsed is None:
+            elapsed = self.now % self.duration
+        return previous * (1 - elapsed / self.duration) + current
+
+    def wait(self):
+        """Seconds until one more request fits."""
+        remaining = self.duration - self.now % self.duration
+        if not self.sliding():
+            return remaining
+        if self.current < self.num_requests:
+            # Later in this window, once enough of the previous one has slid out.
+            needed = 1 - (self.num_requests - self.current - 1) / self.previous
+            return max(0, needed * self.duration - (self.duration - remaining))
+        # This window is full: into the next one, where this window's count is the previous.
+        return remaining + (1 - (self.num_requests - 1) / self.current) * self.duration
+
+
+class AnonRateThrottle(WindowRateThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(WindowRateThrottleMixin, throttling.UserRateThrottle):
+    pass
+
+
+class AuthThrottle(AnonRateThrottle):
+    rate = '20/hour'
+    scope = 'auth'
@@ -0,0 +1,93 @@
+"""Refresh-token rotation with a cached blacklist check.
+
+Every ``/api/auth/token/refresh/`` call rotates the refresh token and
+blacklists the old one (``ROTATE_REFRESH_TOKENS``/``BLACKLIST_AFTER_ROTATION``).
+With rotation, each valid refresh token is presented exactly once. A separate
+"is it blacklisted?" query would always miss, so it is folded into the write:
+``RotatingRefreshToken.claim`` inserts the ``BlacklistedToken`` row, and the
+one-to-one constraint rejects a token that was already used. The database
+stays the source of truth, and two concurrent refreshes with the same token
+cannot both succeed.
+
+In front of that sits a set of recently blacklisted JTIs in the default cache.
+Replays of a just-rotated or logged-out token are rejected there without
+touching the database. Entries expire with the token, or after
+``RECENT_BLACKLIST_TIMEOUT`` at most, so the set stays bounded. Deployments
+with several processes need a shared cache backend for the fast path to see
+other workers' rotations. The claim is correct either way.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+RECENT_BLACKLIST_TIMEOUT = 24 * 60 * 60
+
+
+def _recent_key(jti):
+    return f'jwt:blacklisted:{jti}'
+
+
+def remember_blacklisted(jti, exp):
+    """Add ``jti`` to the recent set until the token expires (capped at ``RECENT_BLACKLIST_TIMEOUT``)."""
+    remaining = int(exp - aware_utcnow().timestamp())
+    if remaining > 0:
+        cache.set(_recent_key(jti), True, min(remaining, RECENT_BLACKLIST_TIMEOUT))
+
+
+def recently_blacklisted(jti):
+    return cache.get(_recent_key(jti), False)
+
+
+def claims_on_use():
+    return api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION
+
+
+class RotatingRefreshToken(RefreshToken):
+    """A refresh token whose blacklist check happens when it is claimed, not when it is read."""
+
+    def check_blacklist(self):
+        if recently_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+        if not claims_on_use():
+            super().check_blacklist()
+
+    def claim(self):
+        """Blacklist this token; raises ``IntegrityError`` if it already was. Run it in a transaction."""
+        jti = self.payload[api_settings.JTI_CLAIM]
+        try:
+            outstanding_id = OutstandingToken.objects.values_list('pk', flat=True).get(jti=jti)
+        except OutstandingToken.DoesNotExist:  # issued before the blacklist app was installed
+            outstanding_id = self.outstand()[0].pk
+        # The unsaved stand-in carries what the post_save receiver needs without a query.
+        BlacklistedToken.objects.create(
+            token=OutstandingToken(pk=outstanding_id, jti=jti, expires_at=self.expires_at),
+        )
+
+    @property
+    def expires_at(self):
+        return datetime_from_epoch(self.payload['exp'])
+
+    def outstand_for(self, user):
+        """Record this freshly issued token as outstanding (one INSERT; its JTI is new)."""
+        return OutstandingToken.objects.create(
+            user=user,
+            jti=self.payload[api_settings.JTI_CLAIM],
+            token=str(self),
+            created_at=self.current_time,
+            expires_at=self.expires_at,
+        )
+
+
+@receiver(post_save, sender=BlacklistedToken, dispatch_uid='api_remember_blacklisted_token')
+def blacklisted_token_saved(sender, instance, created, raw=False, **kwargs):
+    """Feed the recent set from every blacklisting: rotation, logout and the admin."""
+    if created and not raw:
+        token = instance.token
+        transaction.on_commit(lambda: remember_blacklisted(token.jti, token.expires_at.timestamp()))
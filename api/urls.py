@@ -10,12 +10,14 @@ from .auth_views import (
     TokenRefreshThrottleView,
 )
 from .me_views import (
+    BookStateBatchView,
+    BookStateView,
     FavoritesDestroyView,
     FavoritesListCreateView,
     ReadDestroyView,
     ReadListCreateView,
 )
-from .views import router
+from .views import BookExportView, router
 
 urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='api-register'),
@@ -29,4 +31,7 @@ urlpatterns = [
     path('me/favorites/<slug:book_slug>/', FavoritesDestroyView.as_view(), name='api-favorites-destroy'),
     path('me/read/', ReadListCreateView.as_view(), name='api-read-list'),
     path('me/read/<slug:book_slug>/', ReadDestroyView.as_view(), name='api-read-destroy'),
+    path('me/books/state/', BookStateBatchView.as_view(), name='api-book-state-batch'),
+    path('me/books/<slug:book_slug>/state/', BookStateView.as_view(), name='api-book-state'),
+    path('books/export/', BookExportView.as_view(), name='api-book-export'),
 ] + router.urls
@@ -1,37 +1,90 @@
-from django.db.models import Count
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.routers import DefaultRouter
+from rest_framework.views import APIView
 
+from books_market.counts import book_count_key, cached_count
+from books_market.exporter import (
+    CONTENT_TYPES, FORMATS, aexport_chunks, aiter_book_batches, export_lines, iter_book_rows,
+)
 from books_market.models import Category, Book
-from .serializers import CategorySerializer, BookListSerializer, BookDetailSerializer
+from books_market.search import search_queryset
+from .cache import CatalogueCacheMixin
+from .pagination import KeysetPagination
+from .serializers import BookDetailSerializer, BookListRowSerializer, CategorySerializer, book_list_values
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     lookup_field = 'slug'
     lookup_url_kwarg = 'slug'
 
     def get_queryset(self):
-        return Category.objects.annotate(book_count=Count('book')).order_by('title')
+        return Category.objects.order_by('title')
 
 
-class BookViewSet(viewsets.ReadOnlyModelViewSet):
+class BookViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
+    """Books; ``?cursor=`` switches the list to keyset pagination on (title, id)."""
     lookup_field = 'slug'
     lookup_url_kwarg = 'slug'
+    keyset_ordering = ('title', 'id')
+
+    @property
+    def paginator(self):
+        params = self.request.query_params
+        if not hasattr(self, '_paginator') and 'cursor' in params and not params.get('search'):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    def get_cached_count(self):
+        category_slug = self.request.query_params.get('category')
+        if category_slug:
+            return Category.objects.filter(slug=category_slug).values_list('book_count', flat=True).first() or 0
+        return cached_count(book_count_key(), Book.objects.all())
 
     def get_queryset(self):
-        qs = Book.objects.select_related('category', 'language')
+        qs = Book.objects.select_related('category', 'language').order_by('title', 'id')
         category_slug = self.request.query_params.get('category')
         if category_slug:
             qs = qs.filter(category__slug=category_slug)
-        return qs
+        if self.action != 'list':
+            return qs
+        search = (self.request.query_params.get('search') or '').strip()
+        if search:
+            qs = search_queryset(qs, search)
+        return book_list_values(qs)
 
     def get_serializer_class(self):
         if self.action == 'list':
-            return BookListSerializer
+            return BookListRowSerializer
         return BookDetailSerializer
 
 
+class BookExportView(APIView):
+    """The whole catalogue (or ``?category=<slug>``) streamed as ``?type=ndjson`` (default) or ``csv``."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        fmt = request.query_params.get('type', 'ndjson')
+        if fmt not in FORMATS:
+            raise ValidationError({'type': f"Expected one of: {', '.join(FORMATS)}."})
+        qs = Book.objects.all()
+        category_slug = request.query_params.get('category')
+        if category_slug:
+            qs = qs.filter(category__slug=category_slug)
+        if isinstance(request._request, ASGIRequest):
+            # An async body is sent chunk by chunk; a sync one would be read into memory first.
+            content = aexport_chunks(fmt, aiter_book_batches(qs))
+        else:
+            content = export_lines(fmt, iter_book_rows(qs))
+        response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="books.{fmt}"'
+        return response
+
+
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='api-category')
 router.register(r'books', BookViewSet, basename='api-book')
@@ -1,10 +1,11 @@
 from django.contrib import admin
-from .models import Category, Language, Book, BookFavorite, BookRead
+from django.utils import timezone
+from .models import Category, Language, Book, BookFavorite, BookRead, OutgoingEmail, SlowQuery
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['title', 'slug', 'description']
+    list_display = ['title', 'slug', 'book_count', 'description']
     prepopulated_fields = {'slug': ('title',)}
 
 
@@ -36,3 +37,45 @@ class BookFavoriteAdmin(admin.ModelAdmin):
 class BookReadAdmin(admin.ModelAdmin):
     list_display = ['user', 'book', 'read_at']
     list_filter = ['user']
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'to', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'to']
+    # The body may hold a live password-reset link, so staff never see it.
+    exclude = ['body']
+    readonly_fields = ['to', 'from_email', 'subject', 'attempts', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+
+    @admin.action(description='Retry now')
+    def retry_now(self, request, queryset):
+        # Sent and failed messages have no body left to send.
+        queryset.filter(status=OutgoingEmail.PENDING).update(next_attempt_at=timezone.now())
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['sql_shape_excerpt', 'view', 'calls', 'get_avg_ms', 'max_ms', 'last_seen']
+    list_filter = ['view']
+    search_fields = ['sql_shape', 'view']
+    readonly_fields = [
+        'view', 'sql_shape', 'sql', 'params_fingerprint', 'explain',
+        'calls', 'total_ms', 'max_ms', 'first_seen', 'last_seen',
+    ]
+    exclude = ['fingerprint']
+
+    @admin.display(description='Query shape')
+    def sql_shape_excerpt(self, obj):
+        return obj.sql_shape[:120]
+
+    @admin.display(description='Avg ms', ordering='total_ms')
+    def get_avg_ms(self, obj):
+        return round(obj.avg_ms, 1)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BooksMarketConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'books_market'
+
+    def ready(self):
+        from . import instrumentation, signals, slow_queries  # noqa: F401
@@ -0,0 +1,252 @@
+"""Query-count and latency budgets for every named URL of the site and the API.
+
+``measure_budgets`` requests each URL name from ``books_market.urls`` and
+``api.urls`` ``runs`` times against the current database (fill it with
+``books_market.seeding.seed_catalogue`` first). It compares the highest query
+count and the p95 latency with ``BUDGETS``. The cache is cleared before every
+request, so the figures are for the uncached path and throttles never trip.
+``manage.py check_perf_budgets`` runs it on a throwaway database and writes
+the JSON report.
+"""
+import math
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Book, BookFavorite, BookRead, Category
+from .seeding import SEED_PASSWORD
+
+# URL name: (max queries, p95 latency in ms). Latencies are for a 50k-book
+# SQLite catalogue on a developer laptop; query counts must not grow with data.
+BUDGETS = {
+    'theme_css': (0, 20),
+    'home': (0, 30),
+    'search': (2, 150),
+    'about': (0, 30),
+    'category_list': (2, 100),
+    'category_detail': (3, 100),
+    'book_detail': (4, 50),
+    'book_read': (3, 50),
+    'book_download': (3, 50),
+    'register': (0, 30),
+    'login': (0, 30),
+    'forgot_password': (0, 30),
+    'reset_password': (0, 30),
+    'welcome': (0, 30),
+    'cabinet': (0, 30),
+    'api-register': (4, 800),
+    'api-current-user': (1, 30),
+    'api-token-obtain': (2, 700),
+    'api-token-refresh': (6, 50),
+    'api-logout': (7, 50),
+    'api-password-reset': (2, 50),
+    'api-password-reset-confirm': (2, 800),
+    'api-favorites-list': (3, 50),
+    'api-favorites-destroy': (5, 50),
+    'api-read-list': (3, 50),
+    'api-read-destroy': (5, 50),
+    'api-book-state-batch': (2, 50),
+    'api-book-state': (2, 50),
+    'api-book-export': (2, 200),
+    'api-root': (0, 30),
+    'api-category-list': (2, 100),
+    'api-category-detail': (1, 30),
+    'api-book-list': (2, 100),
+    'api-book-detail': (1, 30),
+}
+
+STATE_BATCH_SIZE = 20
+
+
+def url_names():
+    """Every named URL in the site and API URLconfs."""
+    from api import urls as api_urls
+    from . import urls as site_urls
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield pattern.name
+
+    return set(walk(site_urls.urlpatterns)) | set(walk(api_urls.urlpatterns))
+
+
+class BudgetFixtures:
+    """Objects the budget requests point at, picked from the seeded catalogue."""
+
+    def __init__(self):
+        User = get_user_model()
+        # The fullest category, so list pages render a full page.
+        self.category = Category.objects.order_by('-book_count', 'pk').first()
+        self.book = Book.objects.filter(category=self.category).order_by('pk').first()
+        if self.book is None:
+            raise ValueError("The database has no books; seed it first.")
+        if not self.book.file:
+            self.book.file.save(f'{self.book.slug}.pdf', ContentFile(b'%PDF-1.4\n' + b'0' * 64 * 1024))
+        self.user = (
+            User.objects.filter(book_favorites__isnull=False).distinct().order_by('pk').first()
+            or User.objects.create_user('budget-user', 'budget-user@example.com', SEED_PASSWORD)
+        )
+        self.user.set_password(SEED_PASSWORD)
+        self.user.save(update_fields=['password'])
+        self.reset_user, _ = User.objects.get_or_create(
+            username='budget-reset', defaults={'email': 'budget-reset@example.com'},
+        )
+        self.access = str(RefreshToken.for_user(self.user).access_token)
+        self.state_slugs = ','.join(
+            Book.objects.order_by('pk').values_list('slug', flat=True)[:STATE_BATCH_SIZE]
+        )
+
+    def clients(self):
+        session = APIClient()
+        session.force_login(self.user)
+        jwt = APIClient()
+        jwt.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        return {'anon': APIClient(), 'session': session, 'jwt': jwt}
+
+
+def budget_requests(fx):
+    """URL name -> callable preparing state and returning ``(client, method, path, kwargs, status)``.
+
+    Preparation (fresh tokens, re-adding a favorite to delete) runs outside
+    the measured request.
+    """
+    book, category, user = fx.book, fx.category, fx.user
+
+    def page(name, **kwargs):
+        return lambda: ('anon', 'get', reverse(name, kwargs=kwargs or None), {}, 200)
+
+    def post(client, name, data, status, **kwargs):
+        return client, 'post', reverse(name, kwargs=kwargs or None), {'data': data, 'format': 'json'}, status
+
+    def register():
+        name = f'budget-{uuid.uuid4().hex[:12]}'
+        return post('anon', 'api-register', {
+            'username': name, 'email': f'{name}@example.com',
+            'password': 'Budget-Pass-123', 'password_confirm': 'Budget-Pass-123',
+        }, 201)
+
+    def reset_confirm():
+        fx.reset_user.refresh_from_db()  # the previous run changed the password hash
+        token = default_token_generator.make_token(fx.reset_user)
+        return post('anon', 'api-password-reset-confirm', {
+            'uid': urlsafe_base64_encode(force_bytes(fx.reset_user.pk)), 'token': token,
+            'new_password': 'Budget-Pass-456', 'new_password_confirm': 'Budget-Pass-456',
+        }, 200)
+
+    def destroy(model, name):
+        def prepare():
+            model.objects.get_or_create(user=user, book=book)
+            return 'jwt', 'delete', reverse(name, kwargs={'book_slug': book.slug}), {}, 204
+        return prepare
+
+    return {
+        'theme_css': page('theme_css'),
+        'home': page('home'),
+        'search': lambda: ('anon', 'get', reverse('search'), {'data': {'q': book.title.split()[0]}}, 200),
+        'about': page('about'),
+        'category_list': page('category_list'),
+        'category_detail': page('category_detail', slug=category.slug),
+        'book_detail': page('book_detail', slug=book.slug),
+        'book_read': lambda: ('session', 'get', reverse('book_read', kwargs={'slug': book.slug}), {}, 200),
+        'book_download': lambda: ('session', 'get', reverse('book_download', kwargs={'slug': book.slug}), {}, 200),
+        'register': page('register'),
+        'login': page('login'),
+        'forgot_password': page('forgot_password'),
+        'reset_password': page('reset_password'),
+        'welcome': page('welcome'),
+        'cabinet': page('cabinet'),
+        'api-register': register,
+        'api-current-user': lambda: ('jwt', 'get', reverse('api-current-user'), {}, 200),
+        'api-token-obtain': lambda: post(
+            'anon', 'api-token-obtain', {'username': user.username, 'password': SEED_PASSWORD}, 200),
+        'api-token-refresh': lambda: post(
+            'anon', 'api-token-refresh', {'refresh': str(RefreshToken.for_user(user))}, 200),
+        'api-logout': lambda: post('anon', 'api-logout', {'refresh': str(RefreshToken.for_user(user))}, 200),
+        'api-password-reset': lambda: post('anon', 'api-password-reset', {'email': user.email}, 200),
+        'api-password-reset-confirm': reset_confirm,
+        'api-favorites-list': lambda: ('jwt', 'get', reverse('api-favorites-list'), {}, 200),
+        'api-favorites-destroy': destroy(BookFavorite, 'api-favorites-destroy'),
+        'api-read-list': lambda: ('jwt', 'get', reverse('api-read-list'), {}, 200),
+        'api-read-destroy': destroy(BookRead, 'api-read-destroy'),
+        'api-book-state-batch': lambda: (
+            'jwt', 'get', reverse('api-book-state-batch'), {'data': {'slugs': fx.state_slugs}}, 200),
+        'api-book-state': lambda: (
+            'jwt', 'get', reverse('api-book-state', kwargs={'book_slug': book.slug}), {}, 200),
+        'api-book-export': lambda: (
+            'jwt', 'get', reverse('api-book-export'), {'data': {'category': category.slug}}, 200),
+        'api-root': page('api-root'),
+        'api-category-list': page('api-category-list'),
+        'api-category-detail': page('api-category-detail', slug=category.slug),
+        'api-book-list': page('api-book-list'),
+        'api-book-detail': page('api-book-detail', slug=book.slug),
+    }
+
+
+def _p95(samples):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)]
+
+
+def _consume(response):
+    # The test client closes the response (and sends request_finished) itself,
+    # streaming ones once their content is exhausted.
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+
+
+@override_settings(SLOW_QUERY_MS=0)  # the slow-query log's writes would count against the budgets
+def measure_budgets(runs=20, check_latency=True, names=None):
+    """Measure every budgeted URL; returns ``{name: result}`` with an ``ok`` flag per name."""
+    fx = BudgetFixtures()
+    clients = fx.clients()
+    requests = budget_requests(fx)
+    results = {}
+    for name in sorted(names or BUDGETS):
+        max_queries, p95_budget = BUDGETS[name]
+        queries, latencies, statuses, path = [], [], set(), None
+        for _ in range(runs):
+            client, method, path, kwargs, expected = requests[name]()
+            cache.clear()
+            clients['anon'].cookies.clear()  # api-token-obtain also signs the client in to a session
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(clients[client], method)(path, **kwargs)
+                _consume(response)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+        p95 = _p95(latencies)
+        problems = []
+        if statuses != {expected}:
+            problems.append(f'status {sorted(statuses)}, expected {expected}')
+        if max(queries) > max_queries:
+            problems.append(f'{max(queries)} queries > {max_queries}')
+        if check_latency and p95 > p95_budget:
+            problems.append(f'p95 {p95:.1f} ms > {p95_budget} ms')
+        results[name] = {
+            'path': path,
+            'method': method.upper(),
+            'queries': max(queries),
+            'max_queries': max_queries,
+            'p50_ms': round(sorted(latencies)[len(latencies) // 2], 2),
+            'p95_ms': round(p95, 2),
+            'p95_budget_ms': p95_budget,
+            'problems': problems,
+            'ok': not problems,
+        }
+    return results
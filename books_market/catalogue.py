@@ -0,0 +1,42 @@
+"""Catalogue version counter for cache invalidation.
+
+Any save or delete of a ``Book``, ``Category`` or ``Language`` bumps the
+version (see ``books_market.signals``), so caches keyed on it never serve
+stale catalogue data. The counter lives in the default cache; deployments
+with several processes need a shared cache backend for bumps to reach
+every worker.
+"""
+from django.core.cache import cache
+
+from .counts import invalidate_book_counts
+from .search import get_search_backend
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+
+
+def catalogue_version():
+    return cache.get_or_set(CATALOGUE_VERSION_KEY, 1, None)
+
+
+def bump_catalogue_version():
+    try:
+        return cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, 2, None)
+        return 2
+
+
+def refresh_after_bulk_write(book_ids=(), rebuild_index=False):
+    """Redo the Book signal side effects skipped by ``bulk_create``/``update``.
+
+    Indexes ``book_ids`` for search (or rebuilds the whole index when
+    ``rebuild_index`` is set), drops cached counts and bumps the catalogue
+    version. Category ``book_count`` is the caller's job.
+    """
+    backend = get_search_backend()
+    if rebuild_index:
+        backend.rebuild()
+    elif book_ids:
+        backend.index_many(book_ids)
+    invalidate_book_counts()
+    bump_catalogue_version()
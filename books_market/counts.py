@@ -0,0 +1,34 @@
+"""Row counts served from the cache instead of a live COUNT(*).
+
+Entries are dropped by the signal handlers in ``books_market.signals`` when
+the underlying rows change. ``COUNT_CACHE_TIMEOUT`` bounds staleness when
+several processes each hold their own local-memory cache.
+"""
+from django.core.cache import cache
+
+COUNT_CACHE_TIMEOUT = 300
+
+
+def cached_count(key, queryset):
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def book_count_key():
+    """Key for the number of books in the catalogue (per-category counts live on Category)."""
+    return 'counts:books:all'
+
+
+def favorites_count_key(user_id):
+    return f'counts:favorites:{user_id}'
+
+
+def reads_count_key(user_id):
+    return f'counts:reads:{user_id}'
+
+
+def invalidate_book_counts():
+    cache.delete(book_count_key())
@@ -0,0 +1,112 @@
+"""Streaming catalogue export as NDJSON or CSV.
+
+Books are read in keyset batches on ``id`` (no OFFSET, no long-lived cursor)
+and each batch is iterated with ``.iterator()`` over ``.values()`` rows, so
+neither model instances nor serializers are built and memory stays flat.
+Used by ``manage.py export_books`` and the ``/api/books/export/`` endpoint.
+
+Under ASGI the endpoint streams ``aexport_chunks`` instead: each batch is
+fetched in ``sync_to_async`` and sent as one chunk. The ASGI handler would
+otherwise read a sync iterator to the end before sending anything.
+"""
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Book
+
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+DEFAULT_BATCH_SIZE = 2000
+
+# Output column -> ``values()`` lookup.
+EXPORT_FIELDS = {
+    'id': 'id',
+    'slug': 'slug',
+    'title': 'title',
+    'author': 'author',
+    'published_date': 'published_date',
+    'description': 'description',
+    'category': 'category__title',
+    'category_slug': 'category__slug',
+    'language': 'language__code',
+}
+
+
+def iter_book_rows(queryset=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield one dict per book (keys from ``EXPORT_FIELDS``), in id order."""
+    qs = (queryset if queryset is not None else Book.objects.all()).order_by('id')
+    names = list(EXPORT_FIELDS)
+    lookups = list(EXPORT_FIELDS.values())
+    last_id = 0
+    while True:
+        batch = qs.filter(id__gt=last_id).values_list(*lookups)[:batch_size]
+        count = 0
+        for values in batch.iterator(chunk_size=batch_size):
+            count += 1
+            yield dict(zip(names, values))
+        if count < batch_size:
+            return
+        last_id = values[0]
+
+
+def _fetch_batch(qs, last_id, lookups, batch_size):
+    return list(qs.filter(id__gt=last_id).values_list(*lookups)[:batch_size])
+
+
+async def aiter_book_batches(queryset=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Async ``iter_book_rows``: yields lists of up to ``batch_size`` row dicts."""
+    qs = (queryset if queryset is not None else Book.objects.all()).order_by('id')
+    names = list(EXPORT_FIELDS)
+    lookups = list(EXPORT_FIELDS.values())
+    last_id = 0
+    while True:
+        batch = await sync_to_async(_fetch_batch)(qs, last_id, lookups, batch_size)
+        if batch:
+            yield [dict(zip(names, values)) for values in batch]
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1][0]
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the text instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def export_lines(fmt, rows):
+    if fmt == 'csv':
+        return csv_lines(rows)
+    return ndjson_lines(rows)
+
+
+async def aexport_chunks(fmt, batches):
+    """``export_lines`` over ``aiter_book_batches``: one text chunk per batch."""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        async for batch in batches:
+            yield ''.join(writer.writerow(row.values()) for row in batch)
+    else:
+        async for batch in batches:
+            yield ''.join(ndjson_lines(batch))
@@ -0,0 +1,230 @@
+"""Delivery of protected book files.
+
+``BOOK_FILE_DELIVERY`` selects how the bytes reach the client once the view
+has checked access:
+
+* ``django`` (default): streamed by Django with single-range ``Range`` /
+  ``If-Range`` support (206 / 416). Under WSGI servers that provide
+  ``wsgi.file_wrapper`` (gunicorn, uWSGI) the open file is handed over and sent
+  with ``os.sendfile``; ``FileRange`` keeps the descriptor positioned at the
+  range start so exactly ``Content-Length`` bytes go out.
+* ``x-accel-redirect``: nginx serves the file from an ``internal`` location
+  mapped to ``MEDIA_ROOT`` at ``BOOK_FILE_ACCEL_PREFIX``.
+* ``x-sendfile``: Apache (mod_xsendfile) or lighttpd serves the absolute path.
+
+In the offload modes the proxy also handles ranges and conditional requests.
+``aserve_protected_file`` is the async variant used by the ASGI views.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date
+
+DELIVERY_DJANGO = 'django'
+DELIVERY_X_ACCEL_REDIRECT = 'x-accel-redirect'
+DELIVERY_X_SENDFILE = 'x-sendfile'
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Read-only view of ``length`` bytes of ``file`` starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self._file = file
+        self._remaining = length
+        self.name = getattr(file, 'name', '')
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` (inclusive) for a single byte range, or None to send the whole file.
+
+    Raises ``ValueError`` when the range cannot be satisfied.
+    Multi-range and malformed headers are ignored, as RFC 9110 allows.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def _file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    return if_range.strip() in (etag, last_modified)
+
+
+def _offload_response(fieldfile, mode, filename, content_type, as_attachment):
+    response = HttpResponse(content_type=content_type)
+    if mode == DELIVERY_X_ACCEL_REDIRECT:
+        prefix = settings.BOOK_FILE_ACCEL_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = quote(f'{prefix}/{fieldfile.name}')
+    else:
+        response['X-Sendfile'] = fieldfile.path
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
+
+
+def _resolve(fieldfile):
+    if not fieldfile:
+        raise Http404("File not available")
+    path = fieldfile.path
+    if not os.path.isfile(path):
+        raise Http404("File not found")
+    filename = os.path.basename(fieldfile.name)
+    content_type, _ = mimetypes.guess_type(filename)
+    return path, filename, content_type or "application/octet-stream"
+
+
+def _delivery_mode():
+    mode = getattr(settings, 'BOOK_FILE_DELIVERY', DELIVERY_DJANGO)
+    if mode not in (DELIVERY_DJANGO, DELIVERY_X_ACCEL_REDIRECT, DELIVERY_X_SENDFILE):
+        raise ImproperlyConfigured(f"Unknown BOOK_FILE_DELIVERY: {mode!r}")
+    return mode
+
+
+def _plan(request, path):
+    """Validators and the byte range to send; a ready 416 response if the range is unsatisfiable."""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return None, response
+    if byte_range and not _if_range_matches(request, etag, last_modified):
+        byte_range = None
+    return (size, etag, last_modified, byte_range), None
+
+
+def _set_file_headers(response, plan, content_type):
+    size, etag, last_modified, byte_range = plan
+    if byte_range:
+        start, end = byte_range
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response['Content-Length'] = size
+    response["Content-Type"] = content_type
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def serve_protected_file(request, fieldfile, as_attachment):
+    """Response delivering ``fieldfile`` (a ``FieldFile``); access must be checked by the caller."""
+    path, filename, content_type = _resolve(fieldfile)
+    mode = _delivery_mode()
+    if mode != DELIVERY_DJANGO:
+        return _offload_response(fieldfile, mode, filename, content_type, as_attachment)
+    plan, error = _plan(request, path)
+    if error:
+        return error
+    size, _, _, byte_range = plan
+
+    f = open(path, "rb")
+    try:
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(
+                FileRange(f, start, end - start + 1), as_attachment=as_attachment,
+                filename=filename, status=206,
+            )
+        else:
+            response = FileResponse(f, as_attachment=as_attachment, filename=filename)
+        response.block_size = STREAM_BLOCK_SIZE
+        return _set_file_headers(response, plan, content_type)
+    except Exception:
+        f.close()
+        raise
+
+
+async def _aread_chunks(path, start, length):
+    """Yield ``length`` bytes of ``path`` from ``start``; file I/O runs in the thread pool."""
+    f = await sync_to_async(open, thread_sensitive=False)(path, "rb")
+    try:
+        read = sync_to_async(f.read, thread_sensitive=False)
+        await sync_to_async(f.seek, thread_sensitive=False)(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await read(min(STREAM_BLOCK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await sync_to_async(f.close, thread_sensitive=False)()
+
+
+async def aserve_protected_file(request, fieldfile, as_attachment):
+    """Async counterpart of ``serve_protected_file``.
+
+    Under ASGI the body is an async iterator, so a slow client holds no worker
+    thread between chunks. Under WSGI the sync response is returned unchanged so
+    the server can still use ``wsgi.file_wrapper``/``os.sendfile``.
+    """
+    if not isinstance(request, ASGIRequest):
+        return await sync_to_async(serve_protected_file)(request, fieldfile, as_attachment)
+    path, filename, content_type = await sync_to_async(_resolve, thread_sensitive=False)(fieldfile)
+    mode = _delivery_mode()
+    if mode != DELIVERY_DJANGO:
+        return _offload_response(fieldfile, mode, filename, content_type, as_attachment)
+    plan, error = await sync_to_async(_plan, thread_sensitive=False)(request, path)
+    if error:
+        return error
+    size, _, _, byte_range = plan
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(
+        _aread_chunks(path, start, end - start + 1), status=206 if byte_range else 200,
+    )
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return _set_file_headers(response, plan, content_type)
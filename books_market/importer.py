@@ -0,0 +1,194 @@
+"""Bulk catalogue import from CSV or JSON Lines feeds.
+
+Rows are streamed from the file and written with ``bulk_create`` one batch per
+transaction, so memory stays flat however large the feed is. Each row needs
+``title``, ``author``, ``published_date`` (ISO 8601), ``description`` and
+``category`` (a category title); ``language`` (a code) and ``language_name``
+are optional. Unknown categories and languages are created on first sight.
+
+``bulk_create`` skips model signals, so the importer does their work itself:
+each batch's books are added to the search index and category
+``book_count``/``updated_at`` are bumped in the batch's transaction, and
+cached counts and the catalogue version are refreshed after the last batch.
+Only the imported books are indexed; ``rebuild_search_index`` rebuilds the
+whole index.
+Cover thumbnails are not involved: imported books have no cover files.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .catalogue import refresh_after_bulk_write
+from .models import Book, Category, Language, _base_slug, _highest_suffix, _slug_family
+from .search import get_search_backend
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 1000
+# Slug families per lookup query; keeps well under SQLite's bound-parameter limit.
+SLUG_QUERY_BASES = 300
+
+REQUIRED_FIELDS = ('title', 'author', 'published_date', 'description', 'category')
+
+
+class ImportRowError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    raise ValueError(f"Cannot tell the format of {path}; pass --format.")
+
+
+def read_rows(path, fmt):
+    """Yield ``(line, row)`` pairs from a CSV (with header) or JSON Lines file."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except json.JSONDecodeError as exc:
+                    raise ImportRowError(line, f"invalid JSON ({exc.msg})") from exc
+                if not isinstance(row, dict):
+                    raise ImportRowError(line, "expected a JSON object")
+                yield line, row
+
+
+def allocate_slugs(titles):
+    """Unique slugs for ``titles`` (in order), with one lookup per ``SLUG_QUERY_BASES`` distinct bases.
+
+    Suffixes continue from the highest one in the table, as ``Book.save`` does.
+    Earlier batches must be saved first so their slugs are seen here.
+    """
+    bases = [_base_slug(Book, title) for title in titles]
+    distinct = list(dict.fromkeys(bases))
+    taken = set()
+    for start in range(0, len(distinct), SLUG_QUERY_BASES):
+        family = Q()
+        for base in distinct[start:start + SLUG_QUERY_BASES]:
+            family |= _slug_family(Book.objects, 'slug', base)
+        taken.update(Book.objects.filter(family).values_list('slug', flat=True))
+    free = {base for base in distinct if base not in taken}
+    highest = {base: _highest_suffix(base, taken) for base in distinct if base not in free}
+    slugs = []
+    for base in bases:
+        if base in free:
+            free.discard(base)
+            highest[base] = 0
+            slugs.append(base)
+        else:
+            highest[base] += 1
+            slugs.append(f"{base}-{highest[base]}")
+    return slugs
+
+
+class BookImporter:
+    """Stream rows into ``Book`` with batched ``bulk_create``.
+
+    ``progress`` is called after each batch with ``(rows_created, seconds_elapsed)``.
+    Invalid rows raise ``ImportRowError`` unless ``skip_invalid`` is set, in which
+    case they are passed to ``on_skip`` and left out; batches already written stay.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, skip_invalid=False, progress=None, on_skip=None):
+        self.batch_size = batch_size
+        self.skip_invalid = skip_invalid
+        self.progress = progress
+        self.on_skip = on_skip
+        self.categories = {title: pk for pk, title in Category.objects.values_list('pk', 'title')}
+        self.languages = {code: pk for pk, code in Language.objects.values_list('pk', 'code')}
+        self.created = 0
+        self.skipped = 0
+
+    def run(self, rows):
+        started = time.monotonic()
+        batch = []
+        try:
+            for line, row in rows:
+                try:
+                    batch.append(self._build(line, row))
+                except ImportRowError as exc:
+                    if not self.skip_invalid:
+                        raise
+                    self.skipped += 1
+                    if self.on_skip:
+                        self.on_skip(exc)
+                    continue
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+                    if self.progress:
+                        self.progress(self.created, time.monotonic() - started)
+            if batch:
+                self._write(batch)
+                if self.progress:
+                    self.progress(self.created, time.monotonic() - started)
+        finally:
+            if self.created:
+                refresh_after_bulk_write()
+        return self.created
+
+    def _build(self, line, row):
+        values = {name: str(row.get(name) or '').strip() for name in REQUIRED_FIELDS}
+        missing = [name for name, value in values.items() if not value]
+        if missing:
+            raise ImportRowError(line, f"missing {', '.join(missing)}")
+        try:
+            published = date.fromisoformat(values['published_date'])
+        except ValueError:
+            raise ImportRowError(line, f"bad published_date {values['published_date']!r}") from None
+        return Book(
+            title=values['title'],
+            author=values['author'],
+            published_date=published,
+            description=values['description'],
+            category_id=self._category_id(values['category']),
+            language_id=self._language_id(row),
+        )
+
+    def _category_id(self, title):
+        pk = self.categories.get(title)
+        if pk is None:
+            pk = self.categories[title] = Category.objects.create(title=title, description=title).pk
+        return pk
+
+    def _language_id(self, row):
+        code = str(row.get('language') or '').strip()
+        if not code:
+            return None
+        pk = self.languages.get(code)
+        if pk is None:
+            name = str(row.get('language_name') or '').strip() or code
+            pk = self.languages[code] = Language.objects.get_or_create(code=code, defaults={'name': name})[0].pk
+        return pk
+
+    def _write(self, books):
+        now = timezone.now()
+        with transaction.atomic():
+            for book, slug in zip(books, allocate_slugs([book.title for book in books])):
+                book.slug = slug
+            Book.objects.bulk_create(books, batch_size=self.batch_size)
+            get_search_backend().index_many([book.pk for book in books])
+            for category_id, added in Counter(book.category_id for book in books).items():
+                Category.objects.filter(pk=category_id).update(
+                    book_count=F('book_count') + added, updated_at=now,
+                )
+        self.created += len(books)
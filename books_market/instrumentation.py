@@ -0,0 +1,269 @@
+"""Per-request performance instrumentation.
+
+``PerformanceMiddleware`` times a sample of requests (``PERF_SAMPLE_RATE``)
+and records per view (``view_label``, the same names the slow-query log
+uses): wall time, database query count and time, template render time and
+response size. With ``PERF_SERVER_TIMING`` (on in DEBUG) sampled
+responses also get a ``Server-Timing`` header. Figures go into a
+per-process rolling aggregate (``perf_stats``) that staff can read as JSON
+at ``/admin/perf/`` or as Prometheus text at ``/admin/perf/metrics/``.
+
+Queries are counted by an execute wrapper installed once on every database
+connection (``connection_created``). It does nothing unless the current
+context has an active sample, so unsampled requests pay one context-variable
+lookup per query. Template time comes from the ``TimedDjangoTemplates``
+backend. Work done while a streaming response is being sent is not counted.
+The middleware also exposes the current request (``current_request``) to
+other execute wrappers, such as the slow-query log in
+``books_market.slow_queries``.
+"""
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+DEFAULT_WINDOW = 1000
+
+_current_sample = ContextVar('perf_sample', default=None)
+_current_request = ContextVar('perf_request', default=None)
+
+
+def current_request():
+    """The request being handled in this context (set by PerformanceMiddleware), or None."""
+    return _current_request.get()
+
+
+def view_label(request):
+    """``search_books``, ``FavoritesListCreateView.get`` or ``BookViewSet.list`` for the resolved view."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ''
+    # Django sets view_class on class-based views; DRF viewsets only set cls.
+    view_class = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.func.__name__
+    method = request.method.lower()
+    action = (getattr(match.func, 'actions', None) or {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class Sample:
+    __slots__ = ('started', 'queries', 'db_time', 'template_time', 'template_depth')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper: adds the query to the active sample, if any."""
+    sample = _current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_time += time.perf_counter() - started
+
+
+@receiver(connection_created, dispatch_uid='books_market_perf_execute_wrapper')
+def install_execute_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        sample = _current_sample.get()
+        if sample is None:
+            return super().render(context, request)
+        sample.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_depth -= 1
+            if not sample.template_depth:
+                sample.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time added to the active sample."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class ViewStats:
+    __slots__ = ('count', 'errors', 'wall', 'db_time', 'queries', 'template_time', 'bytes', 'recent')
+
+    def __init__(self, window):
+        self.count = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.bytes = 0
+        self.recent = deque(maxlen=window)
+
+
+def _percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, math.ceil(len(ordered) * pct) - 1)] if ordered else 0.0
+
+
+class PerfStats:
+    """Thread-safe per-view totals plus a window of recent wall times for percentiles."""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._views = defaultdict(lambda: ViewStats(self.window))
+
+    def add(self, view, wall, sample, status, size):
+        with self._lock:
+            stats = self._views[view]
+            stats.count += 1
+            stats.errors += status >= 500
+            stats.wall += wall
+            stats.db_time += sample.db_time
+            stats.queries += sample.queries
+            stats.template_time += sample.template_time
+            stats.bytes += size or 0
+            stats.recent.append(wall)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def _rows(self):
+        with self._lock:
+            return [
+                (name, s.count, s.errors, s.wall, s.queries, s.db_time, s.template_time, s.bytes, sorted(s.recent))
+                for name, s in sorted(self._views.items())
+            ]
+
+    def snapshot(self):
+        """``{view: figures}`` with averages in milliseconds; percentiles cover the recent window."""
+        return {
+            name: {
+                'count': count,
+                'errors': errors,
+                'avg_ms': round(wall / count * 1000, 2),
+                'p50_ms': round(_percentile(recent, 0.50) * 1000, 2),
+                'p95_ms': round(_percentile(recent, 0.95) * 1000, 2),
+                'max_ms': round(recent[-1] * 1000, 2),
+                'db_queries_avg': round(queries / count, 2),
+                'db_ms_avg': round(db_time / count * 1000, 2),
+                'template_ms_avg': round(template_time / count * 1000, 2),
+                'bytes_avg': round(size / count),
+            }
+            for name, count, errors, wall, queries, db_time, template_time, size, recent in self._rows()
+        }
+
+    def prometheus(self):
+        """Prometheus text exposition: per-view counters and recent-window quantiles."""
+        counters = [
+            ('django_view_requests_total', 'Sampled requests per view.'),
+            ('django_view_errors_total', 'Sampled 5xx responses per view.'),
+            ('django_view_seconds_total', 'Wall time spent handling the request.'),
+            ('django_view_db_queries_total', 'Database queries run.'),
+            ('django_view_db_seconds_total', 'Time spent in database queries.'),
+            ('django_view_template_seconds_total', 'Time spent rendering templates.'),
+            ('django_view_response_bytes_total', 'Response body bytes (streaming bodies excluded).'),
+        ]
+        rows = self._rows()
+        lines = []
+        for position, (metric, help_text) in enumerate(counters, start=1):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+            lines += [f'{metric}{{view="{_label(row[0])}"}} {row[position]}' for row in rows]
+        lines += ['# HELP django_view_seconds Recent wall time quantiles per view.',
+                  '# TYPE django_view_seconds gauge']
+        for row in rows:
+            for quantile in (0.5, 0.95):
+                value = _percentile(row[-1], quantile)
+                lines.append(f'django_view_seconds{{view="{_label(row[0])}",quantile="{quantile}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+perf_stats = PerfStats(getattr(settings, 'PERF_WINDOW', DEFAULT_WINDOW))
+
+
+class PerformanceMiddleware:
+    """Samples requests, adds ``Server-Timing`` and feeds ``perf_stats``. Works under WSGI and ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = float(getattr(settings, 'PERF_SAMPLE_RATE', 1.0))
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', settings.DEBUG)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = Sample() if self._sampled() else None
+        tokens = _current_request.set(request), _current_sample.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_sample.reset(tokens[1])
+            _current_request.reset(tokens[0])
+        return self._finish(request, response, sample) if sample else response
+
+    async def __acall__(self, request):
+        sample = Sample() if self._sampled() else None
+        tokens = _current_request.set(request), _current_sample.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_sample.reset(tokens[1])
+            _current_request.reset(tokens[0])
+        return self._finish(request, response, sample) if sample else response
+
+    def _finish(self, request, response, sample):
+        wall = time.perf_counter() - sample.started
+        view = view_label(request) or 'unresolved'
+        if response.streaming:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            size = len(response.content)
+        perf_stats.add(view, wall, sample, response.status_code, size)
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'total;dur={wall * 1000:.1f}, '
+                f'db;dur={sample.db_time * 1000:.1f};desc="{sample.queries} queries", '
+                f'tpl;dur={sample.template_time * 1000:.1f}'
+            )
+        return response
@@ -0,0 +1,233 @@
+"""Load scenario driver: replays a realistic traffic mix against a running server.
+
+Each virtual user is a thread with its own cookie jar. It signs in as one of
+the seeded users (``manage.py seed_catalogue``) to get a JWT pair and a
+session, then picks weighted actions until the deadline: browsing, search,
+book detail, favorite toggling, JWT refresh and file downloads. Only the
+standard library is used, so the driver runs anywhere the project does.
+
+The auth endpoints are throttled (``AuthThrottle``), so long runs from one
+address get 429s on login and refresh. Those are reported per endpoint like
+any other status.
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from .seeding import SEED_PASSWORD
+
+# Action -> relative weight in the mix.
+DEFAULT_MIX = {
+    'browse': 40,
+    'search': 15,
+    'detail': 25,
+    'favorite': 8,
+    'refresh': 5,
+    'download': 7,
+}
+SEARCH_TERMS = ['python', 'data', 'design', 'learning', 'security', 'web', 'linux', 'go']
+TIMEOUT = 30
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (any order)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+
+class Stats:
+    """Thread-safe latency samples and status counts per endpoint label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.bytes = Counter()
+
+    def record(self, label, seconds, status, size):
+        with self._lock:
+            self.latencies[label].append(seconds * 1000)
+            self.statuses[label][status] += 1
+            self.bytes[label] += size
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for label in sorted(self.latencies):
+            samples = self.latencies[label]
+            endpoints[label] = {
+                'requests': len(samples),
+                'rps': round(len(samples) / elapsed, 2) if elapsed else None,
+                'p50_ms': round(percentile(samples, 50), 2),
+                'p90_ms': round(percentile(samples, 90), 2),
+                'p95_ms': round(percentile(samples, 95), 2),
+                'p99_ms': round(percentile(samples, 99), 2),
+                'max_ms': round(max(samples), 2),
+                'statuses': {str(code): n for code, n in sorted(self.statuses[label].items(), key=str)},
+                'bytes': self.bytes[label],
+            }
+        total = sum(e['requests'] for e in endpoints.values())
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'requests': total,
+            'rps': round(total / elapsed, 2) if elapsed else None,
+            'endpoints': endpoints,
+        }
+
+
+class Catalogue:
+    """Category and book slugs to aim at, read once through the public API."""
+
+    def __init__(self, client, max_books=500):
+        data = client.json('GET', '/api/categories/', label='setup')
+        categories = data.get('results', data) if isinstance(data, dict) else data
+        self.categories = [c['slug'] for c in categories or []]
+        self.books = []
+        path = '/api/books/?cursor='
+        while path and len(self.books) < max_books:
+            page = client.json('GET', path, label='setup')
+            self.books += [b['slug'] for b in page['results']]
+            path = page['next']
+        if not self.books:
+            raise ValueError("The server has no books; run manage.py seed_catalogue first.")
+
+
+class Client:
+    """Minimal HTTP client bound to a base URL, with cookies and an optional bearer token."""
+
+    def __init__(self, base_url, stats):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+        self.access = None
+
+    def request(self, method, path, label, data=None, auth=False):
+        url = path if path.startswith('http') else self.base_url + path
+        headers = {'Accept': 'application/json, text/html'}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        if auth and self.access:
+            headers['Authorization'] = f'Bearer {self.access}'
+        started = time.perf_counter()
+        try:
+            with self.opener.open(Request(url, data=body, headers=headers, method=method), timeout=TIMEOUT) as r:
+                content = r.read()
+                status = r.status
+        except HTTPError as exc:
+            content = exc.read()
+            status = exc.code
+        except (URLError, OSError):
+            content, status = b'', 'error'  # connection refused, reset or timed out
+        self.stats.record(label, time.perf_counter() - started, status, len(content))
+        return status, content
+
+    def json(self, method, path, label, data=None, auth=False):
+        status, content = self.request(method, path, label, data=data, auth=auth)
+        if status not in (200, 201):
+            raise ValueError(f"{method} {path} returned {status}")
+        return json.loads(content)
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, base_url, stats, catalogue, username, password, mix, deadline, seed):
+        super().__init__(daemon=True)
+        self.client = Client(base_url, stats)
+        self.catalogue = catalogue
+        self.username = username
+        self.password = password
+        self.actions = list(mix)
+        self.weights = [mix[a] for a in self.actions]
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.refresh = None
+
+    def run(self):
+        self.login()
+        while time.monotonic() < self.deadline:
+            getattr(self, f'do_{self.rng.choices(self.actions, self.weights)[0]}')()
+
+    def login(self):
+        status, content = self.client.request(
+            'POST', '/api/auth/token/', 'POST api-token-obtain',
+            data={'username': self.username, 'password': self.password, 'session': True},
+        )
+        if status == 200:
+            tokens = json.loads(content)
+            self.client.access, self.refresh = tokens['access'], tokens['refresh']
+
+    def do_browse(self):
+        choice = self.rng.random()
+        if choice < 0.2:
+            self.client.request('GET', '/categories/', 'GET category_list')
+        elif choice < 0.7 and self.catalogue.categories:
+            slug = self.rng.choice(self.catalogue.categories)
+            self.client.request('GET', f'/categories/{slug}/', 'GET category_detail')
+        else:
+            self.client.request('GET', '/api/books/?cursor=', 'GET api-book-list')
+
+    def do_search(self):
+        query = urlencode({'q': self.rng.choice(SEARCH_TERMS)})
+        self.client.request('GET', f'/search/?{query}', 'GET search')
+
+    def do_detail(self):
+        slug = self.rng.choice(self.catalogue.books)
+        if self.rng.random() < 0.6:
+            self.client.request('GET', f'/books/{slug}/', 'GET book_detail')
+        else:
+            self.client.request('GET', f'/api/books/{slug}/', 'GET api-book-detail')
+
+    def do_favorite(self):
+        if not self.client.access:
+            return self.do_browse()
+        slug = self.rng.choice(self.catalogue.books)
+        self.client.request('GET', f'/api/me/books/{slug}/state/', 'GET api-book-state', auth=True)
+        self.client.request(
+            'POST', '/api/me/favorites/', 'POST api-favorites-list', data={'book_slug': slug}, auth=True,
+        )
+        self.client.request('DELETE', f'/api/me/favorites/{slug}/', 'DELETE api-favorites-destroy', auth=True)
+
+    def do_refresh(self):
+        if not self.refresh:
+            return self.login()
+        status, content = self.client.request(
+            'POST', '/api/auth/token/refresh/', 'POST api-token-refresh', data={'refresh': self.refresh},
+        )
+        if status == 200:
+            tokens = json.loads(content)
+            self.client.access = tokens['access']
+            self.refresh = tokens.get('refresh', self.refresh)
+
+    def do_download(self):
+        slug = self.rng.choice(self.catalogue.books)
+        self.client.request('GET', f'/books/{slug}/download/', 'GET book_download')
+
+
+def run_load(base_url, duration=60, concurrency=8, mix=None, user_prefix='seed0-user-', users=1000,
+             password=SEED_PASSWORD, seed=0):
+    """Run the scenario for ``duration`` seconds and return the ``Stats.summary()`` report."""
+    stats = Stats()
+    catalogue = Catalogue(Client(base_url, Stats()))
+    deadline = time.monotonic() + duration
+    rng = random.Random(seed)
+    threads = [
+        VirtualUser(base_url, stats, catalogue, f'{user_prefix}{rng.randrange(users)}', password,
+                    mix or DEFAULT_MIX, deadline, seed + i)
+        for i in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.summary(time.monotonic() - started)
@@ -0,0 +1,136 @@
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from books_market.models import Book, BookFavorite, BookRead
+from books_market.seeding import seed_catalogue
+
+SQLITE = 'django.db.backends.sqlite3'
+# What Django uses when DATABASES only names the file.
+DJANGO_DEFAULTS = {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+
+
+def add_favorite(user_id, book_id):
+    BookFavorite.objects.get_or_create(user_id=user_id, book_id=book_id)
+
+
+def remove_favorite(user_id, book_id):
+    BookFavorite.objects.filter(user_id=user_id, book_id=book_id).delete()
+
+
+def mark_read(user_id, book_id):
+    BookRead.objects.get_or_create(user_id=user_id, book_id=book_id)
+
+
+def toggle_read(user_id, book_id):
+    """A transaction that reads before it writes, like a token refresh claim or a slow-query log entry."""
+    with transaction.atomic():
+        entries = BookRead.objects.filter(user_id=user_id, book_id=book_id)
+        if entries.exists():
+            entries.delete()
+        else:
+            BookRead.objects.create(user_id=user_id, book_id=book_id)
+
+
+def list_favorites(user_id, book_id):
+    list(BookFavorite.objects.filter(user_id=user_id).order_by('-created_at').values_list('book_id', flat=True)[:20])
+
+
+OPERATIONS = [add_favorite, remove_favorite, mark_read, toggle_read, list_favorites, list_favorites]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent favorite/read writes and favorite listings against a throwaway SQLite file, "
+        "first with Django's default SQLite settings and then with the configured database profile, "
+        "and report 'database is locked' errors, throughput and latency for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent threads (default 8).')
+        parser.add_argument('--ops', type=int, default=200, help='Operations per worker (default 200).')
+        parser.add_argument('--books', type=int, default=500, help='Books in the throwaway catalogue.')
+
+    def handle(self, *args, **options):
+        if min(options['workers'], options['ops'], options['books']) < 1:
+            raise CommandError("--workers, --ops and --books must be positive.")
+        configured = settings.DATABASES['default']
+        if configured['ENGINE'] != SQLITE:
+            raise CommandError(f"The benchmark compares SQLite profiles; the configured engine is {configured['ENGINE']}.")
+        profiles = [
+            ('Django defaults', DJANGO_DEFAULTS),
+            ('configured profile', {key: configured[key] for key in DJANGO_DEFAULTS}),
+        ]
+        setup_test_environment()
+        try:
+            with override_settings(SLOW_QUERY_MS=0):
+                results = [(name, self._run(profile, options)) for name, profile in profiles]
+        finally:
+            teardown_test_environment()
+
+        total = options['workers'] * options['ops']
+        for name, (seconds, timings, locked) in results:
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95)] if timings else 0
+            self.stdout.write(
+                f"{name}: {total / seconds:.0f} ops/s, {locked}/{total} 'database is locked', "
+                f"p50 {statistics.median(timings) if timings else 0:.1f} ms, p95 {p95:.1f} ms"
+            )
+
+    def _run(self, profile, options):
+        """Seed a fresh SQLite file under ``profile`` and hammer it; returns ``(seconds, timings_ms, locked)``."""
+        tmpdir = tempfile.mkdtemp()
+        saved = {key: connection.settings_dict[key] for key in (*DJANGO_DEFAULTS, 'TEST')}
+        connection.settings_dict.update(profile, TEST={**saved['TEST'], 'NAME': str(Path(tmpdir) / 'bench.sqlite3')})
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed_catalogue(
+                books=options['books'], categories=10, users=options['workers'],
+                favorites_per_user=0, reads_per_user=0,
+            )
+            book_ids = list(Book.objects.values_list('pk', flat=True))
+            user_ids = list(get_user_model().objects.values_list('pk', flat=True))
+            connection.close()
+
+            timings, locked = [], []
+            start = threading.Barrier(len(user_ids))
+
+            def worker(user_id):
+                rng = random.Random(user_id)
+                start.wait()
+                for _ in range(options['ops']):
+                    operation = rng.choice(OPERATIONS)
+                    close_old_connections()  # what request_started/finished do around each request
+                    started = time.perf_counter()
+                    try:
+                        operation(user_id, rng.choice(book_ids))
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        locked.append(exc)
+                    else:
+                        timings.append((time.perf_counter() - started) * 1000)
+                    close_old_connections()
+                connection.close()
+
+            threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in user_ids]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return time.perf_counter() - started, timings, len(locked)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            connection.settings_dict.update(saved)
+            shutil.rmtree(tmpdir, ignore_errors=True)
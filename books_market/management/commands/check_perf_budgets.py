@@ -0,0 +1,74 @@
+import json
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from books_market.budgets import BUDGETS, measure_budgets, url_names
+from books_market.seeding import seed_catalogue
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and check every URL against its query-count "
+        "and p95 latency budget (books_market.budgets). Writes a JSON report and exits "
+        "non-zero when a budget is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=50000)
+        parser.add_argument('--categories', type=int, default=200)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=20, help='Requests per URL (default 20).')
+        parser.add_argument('--report', default='perf-report.json', help='Where to write the JSON report.')
+        parser.add_argument('--no-latency', action='store_true', help='Check query counts only.')
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME', help='Check just these URL names.')
+
+    def handle(self, *args, **options):
+        unbudgeted = url_names() - set(BUDGETS)
+        if unbudgeted:
+            raise CommandError(f"No budget for: {', '.join(sorted(unbudgeted))} (add them to BUDGETS).")
+        unknown = set(options['only'] or ()) - set(BUDGETS)
+        if unknown:
+            raise CommandError(f"Unknown URL name(s): {', '.join(sorted(unknown))}.")
+        volumes = {key: options[key] for key in ('books', 'categories', 'users')}
+        media_root = tempfile.mkdtemp(prefix='perf-budget-media-')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                started = time.monotonic()
+                seed_catalogue(**volumes)
+                self.stdout.write(f"Seeded {volumes} in {time.monotonic() - started:.1f}s")
+                results = measure_budgets(
+                    runs=options['runs'], check_latency=not options['no_latency'], names=options['only'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        for name, result in results.items():
+            line = (f"{name}: {result['queries']}/{result['max_queries']} queries, "
+                    f"p95 {result['p95_ms']:.1f}/{result['p95_budget_ms']} ms")
+            if result['ok']:
+                self.stdout.write(line)
+            else:
+                self.stdout.write(self.style.ERROR(f"{line} -- {'; '.join(result['problems'])}"))
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'database': connection.vendor,
+            'volumes': volumes,
+            'runs': options['runs'],
+            'results': results,
+        }
+        with open(options['report'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        self.stdout.write(f"Report written to {options['report']}")
+        failed = [name for name, result in results.items() if not result['ok']]
+        if failed:
+            raise CommandError(f"{len(failed)} URL(s) over budget: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("All URLs within budget."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from books_market.exporter import DEFAULT_BATCH_SIZE, FORMATS, export_lines, iter_book_rows
+
+
+class Command(BaseCommand):
+    help = "Stream every book as NDJSON or CSV to a file or stdout, in keyset batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout).')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f'Rows fetched per query (default {DEFAULT_BATCH_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        lines = export_lines(options['format'], iter_book_rows(batch_size=options['batch_size']))
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        count = 0
+        with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line)
+                count += 1
+        if options['format'] == 'csv':
+            count -= 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} books to {options['output']}."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from books_market.models import Book
+from books_market.catalogue import bump_catalogue_version
+from books_market.thumbnails import generate_thumbnails, record_cover_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Create missing cover thumbnails for every book and record them on the books "
+        "(use --force to re-render all)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render existing thumbnails.')
+
+    def handle(self, *args, **options):
+        written = unreadable = changed = 0
+        # Each distinct cover once; seeded catalogues share covers between books.
+        names = list(
+            Book.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        for name in names:
+            count = generate_thumbnails(Book(image=name).image, force=options['force'])
+            if count is None:
+                unreadable += 1
+            else:
+                written += count
+                changed += record_cover_thumbnails(name)
+        if changed:
+            # Once for the run: cached API responses hold the old thumbnail URLs.
+            bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} thumbnails for {len(names) - unreadable} cover(s); {unreadable} unreadable."
+        ))
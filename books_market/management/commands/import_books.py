@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from books_market.importer import (
+    DEFAULT_BATCH_SIZE, FORMATS, BookImporter, ImportRowError, detect_format, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load books from a CSV or JSON Lines feed. Rows are streamed and written "
+        "with bulk_create in batches, one transaction per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header row) or JSONL file.')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per INSERT batch and transaction (default {DEFAULT_BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--skip-invalid', action='store_true',
+            help='Report and skip invalid rows instead of stopping at the first one.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        try:
+            fmt = options['format'] or detect_format(options['path'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        importer = BookImporter(
+            batch_size=options['batch_size'],
+            skip_invalid=options['skip_invalid'],
+            progress=self._progress,
+            on_skip=lambda exc: self.stderr.write(f"Skipped {exc}"),
+        )
+        try:
+            importer.run(read_rows(options['path'], fmt))
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        except ImportRowError as exc:
+            raise CommandError(f"{exc} ({importer.created} books imported before it).")
+        summary = f"Imported {importer.created} books."
+        if importer.skipped:
+            summary += f" Skipped {importer.skipped} invalid rows."
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def _progress(self, created, elapsed):
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(f"{created} rows, {rate:,.0f} rows/s")
@@ -0,0 +1,109 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from books_market.exporter import EXPORT_FIELDS
+from books_market.models import Book, BookFavorite, BookRead, Category
+from books_market.pagination import keyset_condition
+from books_market.views import book_card_queryset, related_books_queryset
+
+# Plan lines that mean "every row is read" or "rows are sorted after the fact".
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)\S+(?!.*\bUSING\b.*\bINDEX\b)'),
+    'postgresql': re.compile(r'\bSeq Scan on\b'),
+}
+SORT_PATTERNS = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)'),
+    'postgresql': re.compile(r'^\s*(->\s*)?Sort\b', re.MULTILINE),
+}
+
+
+def _keyset(qs, ordering, sample):
+    """The query a keyset page after ``sample`` runs."""
+    values = [getattr(sample, name.lstrip('-'), None) or 0 for name in ordering]
+    return qs.filter(keyset_condition(ordering, values)).order_by(*ordering)[:25]
+
+
+def audit_cases():
+    """(name, queryset, allowed findings) for the query paths behind each view.
+
+    Keep in sync with books_market/views.py, api/views.py and api/me_views.py.
+    """
+    category = Category.objects.first() or Category(pk=0, title='', slug='')
+    book = Book.objects.first() or Book(pk=0, title='', slug='', category_id=0)
+    user_id = get_user_model().objects.values_list('pk', flat=True).first() or 0
+    now = timezone.now()
+    favorite = BookFavorite.objects.filter(user_id=user_id).first() or BookFavorite(pk=0, created_at=now)
+    read = BookRead.objects.filter(user_id=user_id).first() or BookRead(pk=0, read_at=now)
+    books = Book.objects.select_related('category', 'language')
+    return [
+        # Conditional-GET probe: an aggregate over every category by design.
+        ('category_list probe', Category.objects.order_by().values('pk', 'updated_at'), {'scan'}),
+        ('category_list', Category.objects.order_by('title'), set()),
+        ('category_detail probe', Category.objects.filter(slug=category.slug).values('updated_at'), set()),
+        ('category_detail', _keyset(book_card_queryset().filter(category=category), ('title', 'id'), book), set()),
+        ('book_detail probe', Book.objects.filter(slug=book.slug).values('updated_at', 'category__updated_at'),
+         set()),
+        ('book_detail', books.filter(slug=book.slug), set()),
+        ('book_detail related', _keyset(related_books_queryset(book), ('title', 'id'), book), set()),
+        ('book_detail related wrap', related_books_queryset(book)[:5], set()),
+        ('book_read', Book.objects.filter(slug=book.slug), set()),
+        ('api-category-list', Category.objects.order_by('title'), set()),
+        ('api-book-list', books.order_by('title', 'id')[:20], set()),
+        ('api-book-list ?category', books.filter(category__slug=category.slug).order_by('title', 'id')[:20],
+         set()),
+        ('api-book-list ?cursor', _keyset(books, ('title', 'id'), book), set()),
+        ('api-book-detail', books.filter(slug=book.slug), set()),
+        ('api-book-export', Book.objects.filter(id__gt=book.pk).order_by('id')
+         .values_list(*EXPORT_FIELDS.values())[:2000], set()),
+        ('api-favorites-list', _keyset(
+            BookFavorite.objects.filter(user_id=user_id).select_related('book__category', 'book__language'),
+            ('-created_at', '-id'), favorite), set()),
+        ('api-read-list', _keyset(
+            BookRead.objects.filter(user_id=user_id).select_related('book__category', 'book__language'),
+            ('-read_at', '-id'), read), set()),
+        ('api-book-state', Book.objects.filter(slug=book.slug).annotate(
+            in_favorites=Exists(BookFavorite.objects.filter(user_id=user_id, book=OuterRef('pk'))),
+            in_read=Exists(BookRead.objects.filter(user_id=user_id, book=OuterRef('pk'))),
+        ), set()),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the queryset behind each view and report full table scans and "
+        "temporary sort B-trees. Exits non-zero when an unexpected one is found."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', action='store_true', help='Print every query plan.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        scan_re = FULL_SCAN_PATTERNS.get(vendor)
+        sort_re = SORT_PATTERNS.get(vendor)
+        if scan_re is None:
+            raise CommandError(f"index_audit does not know how to read {vendor} plans.")
+        problems = 0
+        for name, queryset, allowed in audit_cases():
+            plan = queryset.explain()
+            findings = []
+            if 'scan' not in allowed:
+                findings += [f'full scan: {m.group(0)}' for m in scan_re.finditer(plan)]
+            if 'sort' not in allowed:
+                findings += [f'temp sort: {m.group(0).strip()}' for m in sort_re.finditer(plan)]
+            if findings:
+                problems += 1
+                self.stdout.write(self.style.ERROR(f'{name}: ' + '; '.join(findings)))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if options['plans'] or findings:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+        if problems:
+            raise CommandError(f'{problems} query path(s) need an index.')
+        self.stdout.write(self.style.SUCCESS('All audited query paths use indexes.'))
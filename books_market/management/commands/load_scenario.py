@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books_market.loadtest import DEFAULT_MIX, run_load
+from books_market.seeding import SEED_PASSWORD
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a browse/search/detail/favorite/refresh/download traffic mix against a "
+        "running server and report throughput and latency percentiles per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run (default 60).')
+        parser.add_argument('--concurrency', type=int, default=8, help='Virtual users (default 8).')
+        parser.add_argument('--user-prefix', default='seed0-user-', help='Seeded username prefix.')
+        parser.add_argument('--users', type=int, default=1000, help='How many seeded users to pick from.')
+        parser.add_argument('--password', default=SEED_PASSWORD)
+        parser.add_argument(
+            '--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+            help='Action weights, e.g. browse=40,search=15,detail=25,favorite=8,refresh=5,download=7.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--report', help='Also write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        if options['concurrency'] < 1 or options['users'] < 1 or options['duration'] <= 0:
+            raise CommandError("--concurrency, --users and --duration must be positive.")
+        try:
+            result = run_load(
+                options['base_url'],
+                duration=options['duration'],
+                concurrency=options['concurrency'],
+                mix=mix,
+                user_prefix=options['user_prefix'],
+                users=options['users'],
+                password=options['password'],
+                seed=options['seed'],
+            )
+        except ValueError as exc:
+            raise CommandError(f"Cannot start the scenario: {exc}")
+        self.stdout.write(
+            f"{result['requests']} requests in {result['elapsed_s']}s ({result['rps']} req/s)"
+        )
+        self.stdout.write(f"{'endpoint':36} {'reqs':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8}  statuses")
+        for label, row in result['endpoints'].items():
+            statuses = ' '.join(f"{code}:{n}" for code, n in row['statuses'].items())
+            self.stdout.write(
+                f"{label:36} {row['requests']:>6} {row['rps']:>7} {row['p50_ms']:>8} "
+                f"{row['p95_ms']:>8} {row['p99_ms']:>8}  {statuses}"
+            )
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+    def _parse_mix(self, text):
+        mix = {}
+        for part in text.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in DEFAULT_MIX:
+                raise CommandError(f"Unknown action {name!r}; expected one of {', '.join(DEFAULT_MIX)}.")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Bad weight for {name}: {weight!r}")
+        if not any(mix.values()):
+            raise CommandError("--mix needs at least one positive weight.")
+        return mix
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from books_market.outbox import prunable, prune
+
+
+class Command(BaseCommand):
+    help = "Delete sent and failed outbox messages older than --days. Run it daily next to run_outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Keep messages this many days (default 7).')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError("--days must not be negative.")
+        if options['dry_run']:
+            self.stdout.write(f"Would delete {prunable(options['days']).count()} message(s).")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Deleted {prune(options['days'])} message(s)."))
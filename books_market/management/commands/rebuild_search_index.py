@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from books_market.models import Book
+from books_market.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the book full-text search index from the Book table."
+
+    def handle(self, *args, **options):
+        get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {Book.objects.count()} books."))
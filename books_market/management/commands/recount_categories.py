@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from books_market.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recompute Category.book_count from the Book table and fix any drift."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                Category.objects.annotate(actual=Count('book'))
+                .exclude(book_count=F('actual'))
+                .values_list('pk', 'title', 'book_count', 'actual')
+            )
+            for pk, title, stored, actual in drifted:
+                Category.objects.filter(pk=pk).update(book_count=actual)
+                self.stdout.write(f"{title}: {stored} -> {actual}")
+        self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifted)} categories."))
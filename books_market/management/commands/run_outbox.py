@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books_market.outbox import DEFAULT_BATCH_SIZE, DEFAULT_MAX_ATTEMPTS, send_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued emails (books_market.outbox) in batches over one backend connection, "
+        "retrying failures with exponential backoff. Runs until stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Send everything due now, then exit.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                            help='Attempts before a message is marked failed.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls when idle.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['max_attempts'] < 1:
+            raise CommandError("--batch-size and --max-attempts must be positive.")
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = send_due(options['batch_size'], options['max_attempts'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}.")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_sent} sent, {total_failed} failed attempt(s)."))
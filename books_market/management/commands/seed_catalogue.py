@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from books_market.seeding import SEED_PASSWORD, seed_catalogue
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic catalogue (categories, languages, books with "
+        "dummy covers and PDFs, users, favorites and read marks) using bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=50000)
+        parser.add_argument('--categories', type=int, default=200)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--favorites-per-user', type=int, default=10)
+        parser.add_argument('--reads-per-user', type=int, default=10)
+        parser.add_argument('--covers', type=int, default=20, help='Distinct cover images (0 for none).')
+        parser.add_argument('--files', type=int, default=20, help='Distinct PDF files (0 for none).')
+        parser.add_argument('--file-size', type=int, default=256 * 1024, help='Bytes per PDF.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; also prefixes slugs and usernames.')
+        parser.add_argument('--force', action='store_true', help='Allow seeding when DEBUG is off.')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("DEBUG is off; pass --force if you really want synthetic data in this database.")
+        counts = [options[key] for key in ('books', 'categories', 'users', 'covers', 'files', 'batch_size')]
+        if min(counts) < 0 or options['batch_size'] == 0:
+            raise CommandError("Volumes must not be negative and --batch-size must be positive.")
+        if options['books'] and not options['categories']:
+            raise CommandError("Books need at least one category.")
+        created = seed_catalogue(
+            books=options['books'],
+            categories=options['categories'],
+            users=options['users'],
+            favorites_per_user=options['favorites_per_user'],
+            reads_per_user=options['reads_per_user'],
+            covers=options['covers'],
+            files=options['files'],
+            file_size=options['file_size'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            progress=lambda message: self.stdout.write(f"  {message}"),
+        )
+        summary = ', '.join(f"{count} {name}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}."))
+        if options['users']:
+            self.stdout.write(f"Users are seed{options['seed']}-user-<n> with password {SEED_PASSWORD!r}.")
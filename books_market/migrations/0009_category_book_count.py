@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:26
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_book_counts(apps, schema_editor):
+    Category = apps.get_model('books_market', 'Category')
+    for category in Category.objects.annotate(n=Count('book')):
+        if category.n:
+            Category.objects.filter(pk=category.pk).update(book_count=category.n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_market', '0008_catalogue_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_book_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_market', '0010_book_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(editable=False, max_length=40)),
+                ('view', models.CharField(blank=True, max_length=200)),
+                ('sql_shape', models.TextField()),
+                ('sql', models.TextField(help_text='Latest occurrence, with parameter placeholders.')),
+                ('params_fingerprint', models.CharField(help_text='Hash of the latest parameters.', max_length=16)),
+                ('explain', models.TextField(blank=True, help_text='Plan of the slowest occurrence.')),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'slow queries',
+                'ordering': ['-total_ms'],
+                'unique_together': {('fingerprint', 'view')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_market', '0012_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='cover_thumbnails',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
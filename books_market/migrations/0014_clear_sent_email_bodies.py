@@ -0,0 +1,23 @@
+# Clear bodies (which may hold live password-reset links) of messages already sent or failed
+
+from django.db import migrations
+
+
+def clear_bodies(apps, schema_editor):
+    OutgoingEmail = apps.get_model('books_market', 'OutgoingEmail')
+    OutgoingEmail.objects.filter(status__in=['sent', 'failed']).update(body='')
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_market', '0013_book_cover_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_bodies, noop),
+    ]
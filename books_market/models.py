@@ -1,40 +1,96 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Q
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
 from django.utils.text import slugify
 
 
+SLUG_SAVE_ATTEMPTS = 5
+
+
+def _slug_family(manager, slug_field_name: str, base_slug: str):
+    """Q matching ``base_slug`` and every ``base_slug-*`` slug with an indexed lookup."""
+    prefix = f"{base_slug}-"
+    if connections[manager.db].vendor == "sqlite":
+        # Binary collation: ['base-', 'base.') is exactly the prefix and walks the unique index.
+        prefixed = Q(**{f"{slug_field_name}__gte": prefix, f"{slug_field_name}__lt": f"{base_slug}."})
+    else:
+        # LIKE 'base-%' uses the pattern-ops index Django adds for slug fields on PostgreSQL.
+        prefixed = Q(**{f"{slug_field_name}__startswith": prefix})
+    return Q(**{slug_field_name: base_slug}) | prefixed
+
+
+def _highest_suffix(base_slug: str, slugs) -> int:
+    """Largest N among ``base_slug-N`` in ``slugs`` (0 if there is none)."""
+    prefix = f"{base_slug}-"
+    suffixes = (slug[len(prefix):] for slug in slugs if slug.startswith(prefix))
+    return max((int(s) for s in suffixes if s.isdigit()), default=0)
+
+
+def _base_slug(model, title):
+    """Slug base for ``title``; titles with nothing sluggable fall back to the model name."""
+    return slugify(title) or model._meta.model_name
+
+
 def _generate_unique_slug(manager, slug_field_name: str, base_slug: str, exclude_pk=None):
-    """Generate a unique slug for the given manager, appending a number if needed."""
-    slug = base_slug
-    counter = 1
-    filter_kwargs = {slug_field_name: slug}
-    while True:
-        qs = manager.filter(**filter_kwargs)
-        if exclude_pk is not None:
-            qs = qs.exclude(pk=exclude_pk)
-        if not qs.exists():
-            return slug
-        slug = f"{base_slug}-{counter}"
-        filter_kwargs[slug_field_name] = slug
-        counter += 1
+    """Return ``base_slug`` if free, else ``base_slug-N`` with N one above the highest suffix in use.
+
+    Runs a single indexed query for the base slug and every ``base_slug-*`` slug.
+    """
+    qs = manager.filter(_slug_family(manager, slug_field_name, base_slug))
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    taken = set(qs.values_list(slug_field_name, flat=True))
+    if base_slug not in taken:
+        return base_slug
+    return f"{base_slug}-{_highest_suffix(base_slug, taken) + 1}"
+
+
+def _save_with_slug(instance, save):
+    """Save ``instance`` atomically, first allocating a unique slug from its title if it has none.
+
+    A concurrent save can claim the same slug between allocation and INSERT; the
+    unique constraint then raises IntegrityError and the slug is allocated again.
+    """
+    if instance.slug or not instance.title:
+        with transaction.atomic():
+            save()
+        return
+    manager = type(instance)._default_manager
+    base_slug = _base_slug(type(instance), instance.title)
+    for attempt in range(SLUG_SAVE_ATTEMPTS):
+        instance.slug = _generate_unique_slug(manager, "slug", base_slug, exclude_pk=instance.pk)
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            slug_taken = manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not slug_taken or attempt == SLUG_SAVE_ATTEMPTS - 1:
+                instance.slug = None
+                raise
 
 
 class Category(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, null=True, blank=True)
     description = models.TextField()
+    # Maintained by books_market.signals; repair with `manage.py recount_categories`.
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+    # Also bumped when a member book changes; drives conditional GET on category pages.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["title"], name="category_title_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug and self.title:
-            base_slug = slugify(self.title)
-            self.slug = _generate_unique_slug(
-                Category.objects, "slug", base_slug, exclude_pk=self.pk
-            )
-        super().save(*args, **kwargs)
+        _save_with_slug(self, lambda: super(Category, self).save(*args, **kwargs))
 
 
 class Language(models.Model):
@@ -65,17 +121,24 @@ class Book(models.Model):
         null=True,
         blank=True,
     )
+    # Widths whose WebP and JPEG cover renditions exist (books_market.thumbnails).
+    cover_thumbnails = models.JSONField(default=list, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # category_detail and ?category= API listing: filter + keyset order in one index.
+            models.Index(fields=["category", "title", "id"], name="book_category_title_idx"),
+            # Unfiltered API listing ordered by (title, id).
+            models.Index(fields=["title", "id"], name="book_title_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug and self.title:
-            base_slug = slugify(self.title)
-            self.slug = _generate_unique_slug(
-                Book.objects, "slug", base_slug, exclude_pk=self.pk
-            )
-        super().save(*args, **kwargs)
+        # Atomic, so the category book_count update in post_save commits with the row.
+        _save_with_slug(self, lambda: super(Book, self).save(*args, **kwargs))
 
 
 class BookFavorite(models.Model):
@@ -94,6 +157,9 @@ class BookFavorite(models.Model):
     class Meta:
         unique_together = [["user", "book"]]
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="favorite_user_created_idx"),
+        ]
 
 
 class BookRead(models.Model):
@@ -112,3 +178,63 @@ class BookRead(models.Model):
     class Meta:
         unique_together = [["user", "book"]]
         ordering = ["-read_at"]
+        indexes = [
+            models.Index(fields=["user", "-read_at", "-id"], name="read_user_read_at_idx"),
+        ]
+
+
+class SlowQuery(models.Model):
+    """Queries over ``SLOW_QUERY_MS``, aggregated by normalized SQL shape and calling view."""
+
+    fingerprint = models.CharField(max_length=40, editable=False)
+    view = models.CharField(max_length=200, blank=True)
+    sql_shape = models.TextField()
+    sql = models.TextField(help_text="Latest occurrence, with parameter placeholders.")
+    params_fingerprint = models.CharField(max_length=16, help_text="Hash of the latest parameters.")
+    explain = models.TextField(blank=True, help_text="Plan of the slowest occurrence.")
+    calls = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = [["fingerprint", "view"]]
+        ordering = ["-total_ms"]
+        verbose_name_plural = "slow queries"
+
+    def __str__(self):
+        return f"{self.view or '-'}: {self.sql_shape[:80]}"
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+class OutgoingEmail(models.Model):
+    """A queued email; ``manage.py run_outbox`` sends it (see books_market.outbox)."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    to = models.JSONField(help_text="Recipient addresses.")
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at", "id"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)}"
@@ -0,0 +1,113 @@
+"""Email outbox: views queue messages, ``manage.py run_outbox`` sends them.
+
+``enqueue_email`` is one INSERT, so a slow or failing SMTP relay never holds
+a request. ``send_due`` claims a batch of due messages, sends them over one
+backend connection and records the result of each. A failed message is
+retried with exponential backoff (``RETRY_BASE_SECONDS`` doubled per attempt,
+at most ``RETRY_MAX_SECONDS``) and marked failed after ``max_attempts``.
+The body is cleared as soon as a message is sent or marked failed, because
+it may hold a live password-reset link; ``prune`` (``manage.py
+prune_outbox``) deletes the remaining rows once they are old.
+
+Claiming pushes ``next_attempt_at`` past ``CLAIM_SECONDS`` in the same
+transaction that selects the rows (with ``SKIP LOCKED`` where the database has
+it). Several workers therefore never pick the same message, and a worker
+that dies mid-batch only delays its messages.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 60 * 60
+CLAIM_SECONDS = 5 * 60
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    """Queue a plain-text email for ``run_outbox``; returns the ``OutgoingEmail``."""
+    return OutgoingEmail.objects.create(
+        subject=subject, body=body, to=list(to), from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the ``attempts``-th failure."""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def _claim(batch_size, now):
+    due = OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due.order_by('next_attempt_at', 'id')[:batch_size])
+        OutgoingEmail.objects.filter(pk__in=[m.pk for m in batch]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS),
+        )
+    return batch
+
+
+def send_due(batch_size=DEFAULT_BATCH_SIZE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Send one batch of due messages; returns ``(sent, failed)`` counts for the batch."""
+    now = timezone.now()
+    batch = _claim(batch_size, now)
+    if not batch:
+        return 0, 0
+    sent = failed = 0
+    backend = get_connection(fail_silently=False)
+    try:
+        backend.open()
+    except Exception as exc:  # relay down: every message in the batch waits for a retry
+        for message in batch:
+            _record_failure(message, exc, max_attempts)
+        return 0, len(batch)
+    try:
+        for message in batch:
+            email = EmailMessage(
+                subject=message.subject, body=message.body, from_email=message.from_email,
+                to=message.to, connection=backend,
+            )
+            try:
+                email.send()
+            except Exception as exc:
+                _record_failure(message, exc, max_attempts)
+                failed += 1
+            else:
+                OutgoingEmail.objects.filter(pk=message.pk).update(
+                    status=OutgoingEmail.SENT, sent_at=timezone.now(), attempts=message.attempts + 1,
+                    last_error='', body='',
+                )
+                sent += 1
+    finally:
+        backend.close()
+    return sent, failed
+
+
+def _record_failure(message, exc, max_attempts):
+    attempts = message.attempts + 1
+    changes = {'attempts': attempts, 'last_error': f'{type(exc).__name__}: {exc}'[:2000]}
+    if attempts >= max_attempts:
+        changes.update(status=OutgoingEmail.FAILED, body='')
+    else:
+        changes['next_attempt_at'] = timezone.now() + timedelta(seconds=retry_delay(attempts))
+    OutgoingEmail.objects.filter(pk=message.pk).update(**changes)
+
+
+def prunable(days):
+    """Sent and failed messages created more than ``days`` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return OutgoingEmail.objects.filter(
+        status__in=[OutgoingEmail.SENT, OutgoingEmail.FAILED], created_at__lt=cutoff,
+    )
+
+
+def prune(days):
+    """Delete ``prunable(days)``; returns how many messages were deleted."""
+    return prunable(days).delete()[0]
@@ -0,0 +1,118 @@
+"""Keyset (cursor) pagination shared by the HTML views and the API.
+
+Pages are addressed by an opaque cursor holding the sort key of the boundary
+row, so fetching page N costs the same as page 1: no COUNT(*) and no OFFSET.
+The ordering must end with a unique field (usually ``id``) to be total.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _parse_ordering(ordering):
+    return [(f[1:], True) if f.startswith('-') else (f, False) for f in ordering]
+
+
+def _encode(values, reverse):
+    payload = [
+        v.isoformat() if isinstance(v, (date, datetime)) else v for v in values
+    ]
+    raw = json.dumps({'k': payload, 'r': reverse}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode(model, fields, token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        values = data['k']
+        reverse = bool(data['r'])
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise InvalidCursor(token)
+        values = [
+            model._meta.get_field(name).to_python(value)
+            for (name, _), value in zip(fields, values)
+        ]
+    except (binascii.Error, ValueError, KeyError, TypeError, ValidationError) as exc:
+        raise InvalidCursor(token) from exc
+    return values, reverse
+
+
+def _key_of(obj, fields):
+    if isinstance(obj, dict):  # .values() rows
+        return [obj[name] for name, _ in fields]
+    return [getattr(obj, obj._meta.get_field(name).attname) for name, _ in fields]
+
+
+def _after(fields, values, reverse):
+    """Q for rows strictly after ``values`` in the ordering (before, if ``reverse``)."""
+    condition = Q()
+    equal = Q()
+    for (name, desc), value in zip(fields, values):
+        op = 'lt' if desc != reverse else 'gt'
+        condition |= equal & Q(**{f'{name}__{op}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_condition(ordering, values):
+    """Q for rows strictly after the key ``values`` in ``ordering``."""
+    return _after(_parse_ordering(ordering), values, False)
+
+
+def keyset_paginate(queryset, ordering, cursor=None, page_size=20):
+    """Return the ``KeysetPage`` of ``queryset`` that follows ``cursor`` in ``ordering``.
+
+    ``ordering`` is a sequence like ``('title', 'id')`` or ``('-created_at', '-id')``.
+    Raises ``InvalidCursor`` for malformed cursors.
+    """
+    fields = _parse_ordering(ordering)
+    reverse = False
+    qs = queryset
+    if cursor:
+        values, reverse = _decode(queryset.model, fields, cursor)
+        qs = qs.filter(_after(fields, values, reverse))
+    if reverse:
+        qs = qs.order_by(*[name if desc else f'-{name}' for name, desc in fields])
+    else:
+        qs = qs.order_by(*ordering)
+    rows = list(qs[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, bool(cursor)
+    next_cursor = _encode(_key_of(rows[-1], fields), False) if rows and has_next else None
+    previous_cursor = _encode(_key_of(rows[0], fields), True) if rows and has_previous else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,161 @@
+"""Full-text search over the book catalogue.
+
+The default backend keeps an SQLite FTS5 inverted index over title, author and
+description in sync with ``Book`` rows (see ``books_market.signals``). Other
+databases fall back to ``IcontainsSearchBackend``; a custom backend can be set
+with the ``BOOK_SEARCH_BACKEND`` setting (dotted path to a ``SearchBackend``
+subclass).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Book
+
+FTS_TABLE = "books_market_book_fts"
+DEFAULT_MAX_RESULTS = 1000
+# Book ids per statement in ``index_many``; keeps well under SQLite's bound-parameter limit.
+INDEX_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchBackend:
+    """Interface for search backends. ``search`` returns book ids, best match first."""
+
+    def index(self, book):
+        raise NotImplementedError
+
+    def index_many(self, book_ids):
+        """Index the books with ``book_ids``, e.g. after a ``bulk_create``."""
+        for book in Book.objects.filter(pk__in=book_ids):
+            self.index(book)
+
+    def remove(self, book_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query, limit=None):
+        raise NotImplementedError
+
+
+class IcontainsSearchBackend(SearchBackend):
+    """Unindexed fallback: LIKE scans on title and author, no ranking."""
+
+    def index(self, book):
+        pass
+
+    def index_many(self, book_ids):
+        pass
+
+    def remove(self, book_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit=None):
+        query = (query or "").strip()
+        if not query:
+            return []
+        qs = Book.objects.filter(
+            Q(title__icontains=query) | Q(author__icontains=query)
+        ).order_by("title", "pk").values_list("pk", flat=True)
+        if limit is not None:
+            qs = qs[:limit]
+        return list(qs)
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """SQLite FTS5 index; results are ranked by bm25 with title weighted highest."""
+
+    # bm25 column weights: title, author, description.
+    weights = (10.0, 5.0, 1.0)
+
+    def index(self, book):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [book.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, author, description) VALUES (%s, %s, %s, %s)",
+                [book.pk, book.title or "", book.author or "", book.description or ""],
+            )
+
+    def index_many(self, book_ids):
+        book_ids = list(book_ids)
+        book_table = Book._meta.db_table
+        with connection.cursor() as cursor:
+            for start in range(0, len(book_ids), INDEX_BATCH_SIZE):
+                batch = book_ids[start:start + INDEX_BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(batch))
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, author, description) "
+                    f"SELECT id, title, author, description FROM {book_table} WHERE id IN ({placeholders})",
+                    batch,
+                )
+
+    def remove(self, book_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [book_id])
+
+    def rebuild(self):
+        book_table = Book._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, author, description) "
+                f"SELECT id, title, author, description FROM {book_table}"
+            )
+
+    def search(self, query, limit=None):
+        match = build_match_expression(query)
+        if not match:
+            return []
+        sql = (
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, %s, %s, %s), rowid"
+        )
+        params = [match, *self.weights]
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+def build_match_expression(query):
+    """Turn free text into an FTS5 MATCH expression: every word must match, as a prefix.
+
+    Words are quoted so user input can never inject FTS5 operators.
+    """
+    tokens = _TOKEN_RE.findall(query or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def get_search_backend():
+    path = getattr(settings, "BOOK_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "sqlite":
+        return SQLiteFTSSearchBackend()
+    return IcontainsSearchBackend()
+
+
+def search_queryset(queryset, query, limit=None):
+    """Narrow a ``Book`` queryset to matches for ``query``, ordered by relevance."""
+    if limit is None:
+        limit = getattr(settings, "BOOK_SEARCH_MAX_RESULTS", DEFAULT_MAX_RESULTS)
+    ids = get_search_backend().search(query, limit=limit)
+    if not ids:
+        return queryset.none()
+    rank = Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=ids).order_by(rank)
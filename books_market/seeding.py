@@ -0,0 +1,167 @@
+"""Synthetic catalogue data for performance budgets and local load tests.
+
+Everything is written with ``bulk_create`` in batches, so signals do not run;
+category counts are set directly and ``refresh_after_bulk_write`` brings the
+search index, cached counts and catalogue version up to date afterwards.
+Output is deterministic for a given ``seed``.
+"""
+import io
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .catalogue import refresh_after_bulk_write
+from .models import Book, BookFavorite, BookRead, Category, Language
+from .thumbnails import generate_thumbnails, thumbnail_widths
+
+SEED_PASSWORD = 'seed-password'
+LANGUAGES = [
+    ('en', 'English'), ('de', 'German'), ('fr', 'French'), ('es', 'Spanish'),
+    ('uk', 'Ukrainian'), ('pl', 'Polish'), ('it', 'Italian'), ('pt', 'Portuguese'),
+]
+WORDS = (
+    'python django data systems design patterns practical modern guide deep learning '
+    'algorithms networks security cloud distributed databases testing clean code web '
+    'mobile machine vision language compilers functional concurrent rust go java '
+    'kubernetes linux performance scalable architecture introduction advanced handbook'
+).split()
+AUTHORS = [
+    f'{first} {last}'
+    for first in ('Ada', 'Alan', 'Grace', 'Linus', 'Barbara', 'Donald', 'Edsger', 'Margaret')
+    for last in ('Hopper', 'Turing', 'Knuth', 'Liskov', 'Hamilton', 'Ritchie', 'Lovelace', 'Dijkstra')
+]
+
+
+def _title(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+
+
+def _description(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(40, 160))).capitalize() + '.'
+
+
+def _dummy_covers(count, tag, rng):
+    """Write ``count`` solid-colour JPEG covers (with thumbnails); returns their storage names."""
+    names = []
+    for i in range(count):
+        image = Image.new('RGB', (600, 800), tuple(rng.randrange(256) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=80)
+        name = default_storage.save(f'books/covers/{tag}-cover-{i}.jpg', ContentFile(buffer.getvalue()))
+        generate_thumbnails(Book(image=name).image)
+        names.append(name)
+    return names
+
+
+def _dummy_files(count, tag, size):
+    """Write ``count`` placeholder PDFs of about ``size`` bytes; returns their storage names."""
+    body = b'%PDF-1.4\n%' + b'0' * max(size - 16, 0) + b'\n%%EOF\n'
+    return [
+        default_storage.save(f'books/files/{tag}-book-{i}.pdf', ContentFile(body))
+        for i in range(count)
+    ]
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_catalogue(books=50000, categories=200, users=1000, favorites_per_user=10, reads_per_user=10,
+                   languages=len(LANGUAGES), covers=0, files=0, file_size=256 * 1024,
+                   batch_size=2000, seed=0, progress=None):
+    """Insert a synthetic catalogue and return the number of rows created per model.
+
+    ``covers`` and ``files`` are the numbers of distinct dummy cover images and
+    PDFs written to storage; books share them round-robin. Slugs and usernames
+    carry a ``seed<N>-`` prefix so runs with different seeds do not collide.
+    ``progress`` is called with a short message per stage.
+    """
+    rng = random.Random(seed)
+    report = progress or (lambda message: None)
+    tag = f'seed{seed}'
+
+    language_ids = []
+    for code, name in LANGUAGES[:languages]:
+        language_ids.append(Language.objects.get_or_create(code=code, defaults={'name': name})[0].pk)
+
+    category_sizes = [0] * categories
+    assignments = [rng.randrange(categories) for _ in range(books)]
+    for index in assignments:
+        category_sizes[index] += 1
+    Category.objects.bulk_create([
+        Category(
+            title=f'{_title(rng)} {i}', slug=f'{tag}-category-{i}',
+            description=_description(rng)[:300], book_count=category_sizes[i],
+        )
+        for i in range(categories)
+    ], batch_size=batch_size)
+    # Inserted in index order, so pk order matches i (not every backend returns pks).
+    category_ids = list(
+        Category.objects.filter(slug__startswith=f'{tag}-category-').order_by('pk').values_list('pk', flat=True)
+    )
+    report(f'{categories} categories')
+
+    cover_names = _dummy_covers(covers, tag, rng)
+    file_names = _dummy_files(files, tag, file_size)
+    if covers or files:
+        report(f'{covers} covers, {files} files')
+
+    first_day = date(1990, 1, 1)
+    book_rows = (
+        Book(
+            title=_title(rng), slug=f'{tag}-book-{i}', author=rng.choice(AUTHORS),
+            published_date=first_day + timedelta(days=rng.randrange(12000)),
+            description=_description(rng), category_id=category_ids[assignments[i]],
+            language_id=rng.choice(language_ids) if language_ids else None,
+            image=cover_names[i % covers] if covers else None,
+            cover_thumbnails=list(thumbnail_widths()) if covers else [],
+            file=file_names[i % files] if files else None,
+        )
+        for i in range(books)
+    )
+    created = 0
+    for batch in _batched(book_rows, batch_size):
+        Book.objects.bulk_create(batch)
+        created += len(batch)
+        report(f'{created} books')
+    book_ids = list(Book.objects.filter(slug__startswith=f'{tag}-book-').values_list('pk', flat=True))
+
+    User = get_user_model()
+    password = make_password(SEED_PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'{tag}-user-{i}', email=f'{tag}-user-{i}@example.com', password=password)
+        for i in range(users)
+    ], batch_size=batch_size)
+    user_ids = list(User.objects.filter(username__startswith=f'{tag}-user-').values_list('pk', flat=True))
+    report(f'{users} users')
+
+    counts = {
+        'languages': len(language_ids), 'categories': categories, 'books': created, 'users': users,
+        'covers': covers, 'files': files,
+    }
+    for model, per_user, key in ((BookFavorite, favorites_per_user, 'favorites'), (BookRead, reads_per_user, 'reads')):
+        rows = (
+            model(user_id=user_id, book_id=book_id)
+            for user_id in user_ids
+            for book_id in rng.sample(book_ids, min(per_user, len(book_ids)))
+        )
+        counts[key] = 0
+        for batch in _batched(rows, batch_size):
+            model.objects.bulk_create(batch)
+            counts[key] += len(batch)
+        report(f'{counts[key]} {key}')
+
+    refresh_after_bulk_write(book_ids)
+    return counts
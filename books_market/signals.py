@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .catalogue import bump_catalogue_version
+from .counts import favorites_count_key, invalidate_book_counts, reads_count_key
+from .models import Book, BookFavorite, BookRead, Category, Language
+from .search import get_search_backend
+from .thumbnails import update_cover_thumbnails
+
+
+@receiver(post_save, sender=Book, dispatch_uid="books_market_index_book")
+def index_book(sender, instance, raw=False, **kwargs):
+    """Keep the search index in sync with the saved book."""
+    if raw:
+        return
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Book, dispatch_uid="books_market_unindex_book")
+def unindex_book(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+def _update_category(category_id, delta=0):
+    """Adjust the stored book count and mark the category's pages as modified."""
+    Category.objects.filter(pk=category_id).update(
+        # Never go below zero on a drifted counter; recount_categories repairs it.
+        book_count=Greatest(F("book_count") + delta, 0),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(pre_save, sender=Book, dispatch_uid="books_market_remember_category")
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    """Stash the stored category and cover so post_save can tell what changed."""
+    instance._previous_category_id = None
+    instance._previous_image = None
+    if not raw and not instance._state.adding and instance.pk:
+        previous = Book.objects.filter(pk=instance.pk).values_list("category_id", "image").first()
+        if previous:
+            instance._previous_category_id, instance._previous_image = previous
+
+
+@receiver(post_save, sender=Book, dispatch_uid="books_market_category_count_save")
+def update_category_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_category_id", None)
+    if created:
+        _update_category(instance.category_id, 1)
+    elif previous is not None and previous != instance.category_id:
+        _update_category(previous, -1)
+        _update_category(instance.category_id, 1)
+    else:
+        _update_category(instance.category_id)
+
+
+@receiver(post_save, sender=Book, dispatch_uid="books_market_cover_thumbnails")
+def make_cover_thumbnails(sender, instance, created, raw=False, **kwargs):
+    """Render a new cover's thumbnails after the save commits, outside its transaction."""
+    if raw:
+        return
+    name = instance.image.name if instance.image else ""
+    if not created and name == (getattr(instance, "_previous_image", None) or ""):
+        return
+    if instance.cover_thumbnails:  # they belong to the previous cover
+        instance.cover_thumbnails = []
+        Book.objects.filter(pk=instance.pk).update(cover_thumbnails=[])
+    if name:
+        transaction.on_commit(lambda: update_cover_thumbnails(name))
+
+
+@receiver(post_delete, sender=Book, dispatch_uid="books_market_category_count_delete")
+def update_category_on_delete(sender, instance, **kwargs):
+    _update_category(instance.category_id, -1)
+
+
+@receiver(post_save, sender=Book, dispatch_uid="books_market_book_counts_save")
+@receiver(post_delete, sender=Book, dispatch_uid="books_market_book_counts_delete")
+def reset_book_counts(sender, **kwargs):
+    invalidate_book_counts()
+
+
+@receiver(post_save, sender=Book, dispatch_uid="books_market_catalogue_version_book_save")
+@receiver(post_delete, sender=Book, dispatch_uid="books_market_catalogue_version_book_delete")
+@receiver(post_save, sender=Category, dispatch_uid="books_market_catalogue_version_category_save")
+@receiver(post_delete, sender=Category, dispatch_uid="books_market_catalogue_version_category_delete")
+@receiver(post_save, sender=Language, dispatch_uid="books_market_catalogue_version_language_save")
+@receiver(post_delete, sender=Language, dispatch_uid="books_market_catalogue_version_language_delete")
+def catalogue_changed(sender, **kwargs):
+    # Bump now for reads inside this transaction and again on commit, so a
+    # concurrent reader cannot cache pre-commit rows under the new version.
+    bump_catalogue_version()
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=BookFavorite, dispatch_uid="books_market_favorites_count_save")
+@receiver(post_delete, sender=BookFavorite, dispatch_uid="books_market_favorites_count_delete")
+def reset_favorites_count(sender, instance, **kwargs):
+    cache.delete(favorites_count_key(instance.user_id))
+
+
+@receiver(post_save, sender=BookRead, dispatch_uid="books_market_reads_count_save")
+@receiver(post_delete, sender=BookRead, dispatch_uid="books_market_reads_count_delete")
+def reset_reads_count(sender, instance, **kwargs):
+    cache.delete(reads_count_key(instance.user_id))
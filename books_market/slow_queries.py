@@ -0,0 +1,185 @@
+"""Slow-query log: queries over ``SLOW_QUERY_MS`` are aggregated in ``SlowQuery``.
+
+An execute wrapper installed on every database connection times each query.
+When one is over the threshold it is added to a per-process buffer keyed by
+the normalized SQL shape and the calling view. Nothing is written while the
+request runs: the buffer is flushed after a response has been sent
+(``request_finished``), at most every ``SLOW_QUERY_FLUSH_SECONDS``, in its own
+transaction. An entry therefore survives a rollback of the request that ran
+the query, and a slow read never waits for the database's write lock.
+
+A flush writes, per shape and view, the call count and times, the SQL with
+placeholders, a hash of the parameters (never the values, which may be
+personal data) and, for SELECTs, the EXPLAIN plan of the slowest occurrence.
+The plan is refreshed when a new slowest occurrence arrives. Browse them
+under "Slow queries" in the admin. The buffer holds at most ``MAX_PENDING``
+shapes between flushes; further new shapes are dropped.
+
+``SLOW_QUERY_MS = 0`` turns the log off.
+"""
+import hashlib
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .instrumentation import current_request, view_label
+from .models import SlowQuery
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+_READ = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+DEFAULT_FLUSH_SECONDS = 10
+MAX_PENDING = 1000
+
+# Set while the log itself talks to the database.
+_recording = ContextVar('slow_query_recording', default=False)
+_lock = threading.Lock()
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def normalize_sql(sql):
+    """The shape of ``sql``: literals and placeholders become ``?`` and value lists ``(...)``."""
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _VALUE_LIST.sub('(...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def params_fingerprint(params):
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+
+
+def explain(connection, sql, params):
+    """The plan for a SELECT, as text; '' for other statements or when EXPLAIN fails."""
+    if not _READ.match(sql):
+        return ''
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        rows = cursor.fetchall()
+    except DatabaseError:
+        return ''
+    finally:
+        cursor.close()
+    if connection.vendor == 'sqlite':
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+
+
+class PendingEntry:
+    __slots__ = ('shape', 'sql', 'params', 'slowest', 'calls', 'total_ms', 'max_ms', 'last_seen')
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.sql = self.params = self.slowest = None
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen = None
+
+
+def record(connection, sql, params, duration_ms):
+    """Add one slow query to the buffer; ``flush`` writes it out."""
+    shape = normalize_sql(sql)
+    request = current_request()
+    view = view_label(request) if request is not None else ''
+    key = (connection.alias, hashlib.sha1(shape.encode()).hexdigest(), view)
+    with _lock:
+        entry = _pending.get(key)
+        if entry is None:
+            if len(_pending) >= MAX_PENDING:
+                return
+            entry = _pending[key] = PendingEntry(shape)
+        entry.calls += 1
+        entry.total_ms += duration_ms
+        entry.sql, entry.params, entry.last_seen = sql, params, timezone.now()
+        if duration_ms > entry.max_ms:
+            # Kept in memory only, for the EXPLAIN of the slowest occurrence.
+            entry.max_ms, entry.slowest = duration_ms, (sql, params)
+
+
+def flush():
+    """Write the buffered entries to ``SlowQuery``; returns how many were written."""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    written = 0
+    token = _recording.set(True)
+    try:
+        for (alias, fingerprint, view), entry in pending.items():
+            try:
+                _write(connections[alias], fingerprint, view, entry)
+            except DatabaseError:
+                continue  # a missing table (before migrate) or a concurrent insert
+            written += 1
+    finally:
+        _recording.reset(token)
+    return written
+
+
+def _write(connection, fingerprint, view, entry):
+    entries = SlowQuery.objects.using(connection.alias).filter(fingerprint=fingerprint, view=view)
+    with transaction.atomic(using=connection.alias):
+        existing = entries.values_list('pk', 'max_ms').first()
+        changes = {
+            'calls': F('calls') + entry.calls, 'total_ms': F('total_ms') + entry.total_ms,
+            'sql': entry.sql, 'params_fingerprint': params_fingerprint(entry.params), 'last_seen': entry.last_seen,
+        }
+        if existing is None or entry.max_ms > existing[1]:
+            changes.update(max_ms=entry.max_ms, explain=explain(connection, *entry.slowest))
+        if existing is None:
+            changes.update(calls=entry.calls, total_ms=entry.total_ms)
+            SlowQuery.objects.using(connection.alias).create(
+                fingerprint=fingerprint, view=view, sql_shape=entry.shape, **changes,
+            )
+        else:
+            entries.filter(pk=existing[0]).update(**changes)
+
+
+def record_slow_query(execute, sql, params, many, context):
+    """Execute wrapper: passes ``sql`` on and records it if it ran longer than ``SLOW_QUERY_MS``."""
+    threshold = getattr(settings, 'SLOW_QUERY_MS', 0)
+    if not threshold or many or _recording.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= threshold:
+        record(context['connection'], sql, params, duration_ms)
+    return result
+
+
+@receiver(request_finished, dispatch_uid='books_market_slow_query_flush')
+def flush_after_response(sender, **kwargs):
+    global _last_flush
+    interval = getattr(settings, 'SLOW_QUERY_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+    now = time.monotonic()
+    if not _pending or now - _last_flush < interval:
+        return
+    _last_flush = now
+    # request_finished has already closed non-persistent connections; close what the flush reopens.
+    closed = [alias for alias in {key[0] for key in _pending} if connections[alias].connection is None]
+    flush()
+    for alias in closed:
+        connections[alias].close()
+
+
+@receiver(connection_created, dispatch_uid='books_market_slow_query_execute_wrapper')
+def install_execute_wrapper(sender, connection, **kwargs):
+    if record_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_query)
@@ -0,0 +1,38 @@
+from django import template
+from django.utils.html import format_html
+
+from books_market.thumbnails import thumbnail_srcset, thumbnail_url, thumbnail_widths
+
+register = template.Library()
+
+# Listing cards are 300 CSS pixels wide, two per row on phones.
+DEFAULT_SIZES = "(max-width: 600px) 50vw, 300px"
+
+
+@register.simple_tag
+def book_cover(book, loading="lazy", sizes=DEFAULT_SIZES, width=300, height=400):
+    """<picture> for a book cover: WebP srcset with a JPEG srcset fallback."""
+    if not book.image:
+        return ""
+    widths = [w for w in thumbnail_widths() if w in book.cover_thumbnails]
+    if not widths:  # not rendered yet: the full cover
+        return format_html(
+            '<img src="{}" alt="{}" width="{}" height="{}" loading="{}">',
+            book.image.url, book.title, width, height, loading,
+        )
+    fallback_width = min((w for w in widths if w >= width), default=widths[-1])
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" width="{}" height="{}" loading="{}">'
+        '</picture>',
+        thumbnail_srcset(book.image, widths, "webp"),
+        sizes,
+        thumbnail_url(book.image, fallback_width, "jpg", widths),
+        thumbnail_srcset(book.image, widths, "jpg"),
+        sizes,
+        book.title,
+        width,
+        height,
+        loading,
+    )
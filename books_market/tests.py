@@ -1,9 +1,64 @@
-from datetime import date
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from contextlib import contextmanager
+from unittest import mock
 
-from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.db.models import Model
+from django.test import AsyncClient, LiveServerTestCase, TestCase, Client, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
 
-from .models import Category, Language, Book
+from .budgets import BUDGETS, measure_budgets, url_names
+from .instrumentation import perf_stats
+from .models import Category, Language, Book, OutgoingEmail, SlowQuery, _generate_unique_slug
+from .loadtest import run_load
+from .outbox import enqueue_email, retry_delay
+from .search import SQLiteFTSSearchBackend, build_match_expression
+from .seeding import seed_catalogue
+from . import slow_queries
+from .slow_queries import normalize_sql
+from .views import related_books
+from .thumbnails import thumbnail_name
+
+
+class TempMediaMixin:
+    """Point ``MEDIA_ROOT`` (and any ``media_settings``) at a temporary directory for the whole class."""
+    media_settings = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=cls.media_root, **cls.media_settings)
+        media.enable()
+        cls.addClassCleanup(media.disable)
+        super().setUpClass()
+
+
+@contextmanager
+def forbid_deferred_loads():
+    """Fail if code inside the block reads a field that only()/defer() left unloaded."""
+    refresh_from_db = Model.refresh_from_db
+
+    def guarded(self, using=None, fields=None, from_queryset=None):
+        if fields:
+            raise AssertionError(f"{type(self).__name__} loaded deferred field(s) {list(fields)}")
+        return refresh_from_db(self, using=using, fields=fields, from_queryset=from_queryset)
+
+    with mock.patch.object(Model, "refresh_from_db", guarded):
+        yield
 
 
 class CategoryModelTests(TestCase):
@@ -18,6 +73,24 @@ class CategoryModelTests(TestCase):
         cat2.save()
         self.assertEqual(cat2.slug, "python-1")
 
+    def test_slug_suffix_follows_highest_in_one_query(self):
+        Category.objects.create(title="Python", slug="python", description="D")
+        Category.objects.create(title="Python", slug="python-7", description="D")
+        Category.objects.create(title="Python", slug="python-guide", description="D")
+        with self.assertNumQueries(1):
+            slug = _generate_unique_slug(Category.objects, "slug", "python")
+        self.assertEqual(slug, "python-8")
+
+    def test_save_retries_when_slug_taken_concurrently(self):
+        Category.objects.create(title="Python", description="D")
+        # The first allocation races with another save and returns a taken slug.
+        with mock.patch(
+            "books_market.models._generate_unique_slug",
+            side_effect=["python", "python-1"],
+        ):
+            cat = Category.objects.create(title="Python", description="D")
+        self.assertEqual(cat.slug, "python-1")
+
 
 class BookModelTests(TestCase):
     @classmethod
@@ -91,6 +164,24 @@ class CategoryDetailViewTests(TestCase):
         r2 = client.get("/categories/nonexistent-slug/")
         self.assertEqual(r2.status_code, 404)
 
+    def test_category_detail_keyset_pages(self):
+        cat = Category.objects.create(title="Big", slug="big", description="D")
+        for i in range(30):
+            Book.objects.create(
+                title=f"Book {i:02d}", author="A", description="D",
+                published_date=date(2020, 1, 1), category=cat,
+            )
+        client = Client()
+        first = client.get("/categories/big/").context["page"]
+        self.assertEqual(len(first), 24)
+        self.assertFalse(first.has_previous)
+        second = client.get("/categories/big/", {"cursor": first.next_cursor}).context["page"]
+        self.assertEqual([b.title for b in second][0], "Book 24")
+        self.assertFalse(second.has_next)
+        back = client.get("/categories/big/", {"cursor": second.previous_cursor}).context["page"]
+        self.assertEqual([b.pk for b in back], [b.pk for b in first])
+        self.assertEqual(client.get("/categories/big/", {"cursor": "@@"}).status_code, 404)
+
 
 class BookDetailViewTests(TestCase):
     @classmethod
@@ -115,6 +206,32 @@ class BookDetailViewTests(TestCase):
         r2 = client.get("/books/nonexistent-book/")
         self.assertEqual(r2.status_code, 404)
 
+    def _shelf(self, *titles):
+        return [
+            Book.objects.create(
+                title=title, author="A", description="D", published_date=date(2020, 1, 1), category=self.category,
+            )
+            for title in titles
+        ]
+
+    def test_related_books_follow_title_order_and_wrap(self):
+        self._shelf("F", "B", "A", "E", "D", "C")
+        book = Book.objects.get(title="E")
+        self.assertEqual([b.title for b in related_books(book)], ["F", "A", "B", "C"])
+        self.assertEqual([b.title for b in related_books(Book.objects.get(title="A"))], ["B", "C", "D", "E"])
+
+    def test_related_block_and_json_ld_are_cached_until_the_category_changes(self):
+        cache.clear()
+        self._shelf("Alpha", "Beta")
+        client = Client()
+        first = client.get("/books/alpha/")
+        self.assertContains(first, "/books/beta/")
+        self.assertIn('"name": "Alpha"', first.context["json_ld"])
+        with self.assertNumQueries(2):  # conditional-GET probe and the book itself
+            client.get("/books/alpha/")
+        self._shelf("Gamma")
+        self.assertContains(client.get("/books/alpha/"), "/books/gamma/")
+
 
 class SearchBooksViewTests(TestCase):
     @classmethod
@@ -142,3 +259,618 @@ class SearchBooksViewTests(TestCase):
         self.assertEqual(r_q.context["query"], "Python")
         self.assertEqual(len(list(r_q.context["books"])), 1)
         self.assertEqual(r_q.context["books"][0].slug, "python-guide")
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(
+            title="Tech", slug="tech", description="Tech"
+        )
+
+    def _book(self, title, author="Author", description="Desc"):
+        return Book.objects.create(
+            title=title,
+            author=author,
+            description=description,
+            published_date=date(2020, 1, 1),
+            category=self.category,
+        )
+
+    def test_ranks_title_match_above_description_match(self):
+        self._book("Cooking Basics", description="Includes a chapter on django templates")
+        self._book("Django for Beginners")
+        r = Client().get("/search/", {"q": "django"})
+        slugs = [b.slug for b in r.context["books"]]
+        self.assertEqual(slugs, ["django-for-beginners", "cooking-basics"])
+
+    def test_index_follows_save_and_delete(self):
+        book = self._book("Old Title")
+        book.title = "Fresh Title"
+        book.save()
+        client = Client()
+        self.assertEqual(len(client.get("/search/", {"q": "old"}).context["books"]), 0)
+        self.assertEqual(len(client.get("/search/", {"q": "fresh"}).context["books"]), 1)
+        book.delete()
+        self.assertEqual(len(client.get("/search/", {"q": "fresh"}).context["books"]), 0)
+
+    def test_match_expression_quotes_operators(self):
+        self.assertEqual(build_match_expression('c++ AND "x'), '"c"* "AND"* "x"*')
+        self.assertEqual(build_match_expression("  "), "")
+
+
+class CategoryBookCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tech = Category.objects.create(title="Tech", slug="tech", description="D")
+        cls.art = Category.objects.create(title="Art", slug="art", description="D")
+
+    def _counts(self):
+        return dict(Category.objects.values_list("slug", "book_count"))
+
+    def test_count_follows_create_move_and_delete(self):
+        book = Book.objects.create(
+            title="Moving Book", author="A", description="D",
+            published_date=date(2020, 1, 1), category=self.tech,
+        )
+        self.assertEqual(self._counts(), {"tech": 1, "art": 0})
+        book.category = self.art
+        book.save()
+        self.assertEqual(self._counts(), {"tech": 0, "art": 1})
+        book.save()
+        self.assertEqual(self._counts(), {"tech": 0, "art": 1})
+        book.delete()
+        self.assertEqual(self._counts(), {"tech": 0, "art": 0})
+
+    def test_category_list_reads_stored_count_without_join(self):
+        Book.objects.create(
+            title="B", author="A", description="D",
+            published_date=date(2020, 1, 1), category=self.tech,
+        )
+        # One conditional-GET probe, one category query.
+        with self.assertNumQueries(2):
+            response = Client().get("/categories/")
+        counts = {c.slug: c.book_count for c in response.context["categories"]}
+        self.assertEqual(counts, {"art": 0, "tech": 1})
+
+    def test_recount_command_repairs_drift(self):
+        Book.objects.create(
+            title="B", author="A", description="D",
+            published_date=date(2020, 1, 1), category=self.tech,
+        )
+        Category.objects.filter(pk=self.tech.pk).update(book_count=7)
+        out = StringIO()
+        call_command("recount_categories", stdout=out)
+        self.assertEqual(self._counts(), {"tech": 1, "art": 0})
+        self.assertIn("Fixed 1 categories.", out.getvalue())
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Tech", slug="tech", description="D")
+        cls.book = Book.objects.create(
+            title="Cond", slug="cond", author="A", description="D",
+            published_date=date(2020, 1, 1), category=cls.category,
+        )
+
+    def test_book_detail_304_until_book_changes(self):
+        client = Client()
+        first = client.get("/books/cond/")
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.has_header("Last-Modified"))
+        etag = first["ETag"]
+        with self.assertNumQueries(1):
+            again = client.get("/books/cond/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.book.description = "New"
+        self.book.save()
+        self.assertEqual(client.get("/books/cond/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_pages_revalidate_on_member_book_change(self):
+        client = Client()
+        detail_etag = client.get("/categories/tech/")["ETag"]
+        list_etag = client.get("/categories/")["ETag"]
+        self.assertEqual(client.get("/categories/tech/", HTTP_IF_NONE_MATCH=detail_etag).status_code, 304)
+        self.assertEqual(client.get("/categories/", HTTP_IF_NONE_MATCH=list_etag).status_code, 304)
+        Book.objects.create(
+            title="Another", author="A", description="D",
+            published_date=date(2020, 1, 1), category=self.category,
+        )
+        self.assertEqual(client.get("/categories/tech/", HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+        self.assertEqual(client.get("/categories/", HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+
+class BookFileDeliveryTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title="Tech", slug="tech", description="D")
+        cls.book = Book.objects.create(
+            title="Ranged", slug="ranged", author="A", description="D",
+            published_date=date(2020, 1, 1), category=category,
+            file=SimpleUploadedFile("ranged.pdf", b"0123456789", content_type="application/pdf"),
+        )
+        cls.user = get_user_model().objects.create_user(username="reader", password="TestPass123!")
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_requires_login(self):
+        response = Client().get("/books/ranged/read/")
+        self.assertEqual(response.status_code, 302)
+
+    def test_full_file_advertises_ranges(self):
+        response = self.client.get("/books/ranged/download/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    def test_range_requests(self):
+        response = self.client.get("/books/ranged/read/", HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(response["Content-Length"], "4")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+        suffix = self.client.get("/books/ranged/read/", HTTP_RANGE="bytes=-3")
+        self.assertEqual(b"".join(suffix.streaming_content), b"789")
+        unsatisfiable = self.client.get("/books/ranged/read/", HTTP_RANGE="bytes=20-")
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable["Content-Range"], "bytes */10")
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        etag = self.client.get("/books/ranged/read/")["ETag"]
+        matching = self.client.get("/books/ranged/read/", HTTP_RANGE="bytes=0-0", HTTP_IF_RANGE=etag)
+        self.assertEqual(matching.status_code, 206)
+        stale = self.client.get("/books/ranged/read/", HTTP_RANGE="bytes=0-0", HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_offload_modes(self):
+        with self.settings(BOOK_FILE_DELIVERY="x-accel-redirect", BOOK_FILE_ACCEL_PREFIX="/protected/"):
+            response = self.client.get("/books/ranged/read/")
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/{self.book.file.name}")
+        self.assertEqual(response.content, b"")
+        with self.settings(BOOK_FILE_DELIVERY="x-sendfile"):
+            response = self.client.get("/books/ranged/download/")
+        self.assertEqual(response["X-Sendfile"], self.book.file.path)
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    async def test_asgi_streams_with_async_iterator(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/books/ranged/download/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertIn("attachment", response["Content-Disposition"])
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, b"0123456789")
+        ranged = await self.async_client.get("/books/ranged/read/", headers={"Range": "bytes=7-"})
+        self.assertEqual(ranged.status_code, 206)
+        self.assertEqual(b"".join([c async for c in ranged.streaming_content]), b"789")
+
+    async def test_asgi_requires_login(self):
+        response = await self.async_client.get("/books/ranged/read/")
+        self.assertEqual(response.status_code, 302)
+
+
+def _png_upload(name, size=(800, 1000)):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGBA", size, (200, 30, 30, 255)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class CoverThumbnailTests(TempMediaMixin, TestCase):
+    media_settings = {"BOOK_COVER_WIDTHS": [200, 400]}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Art", slug="art", description="D")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.book = Book.objects.create(
+                title="Covered", slug="covered", author="A", description="D",
+                published_date=date(2020, 1, 1), category=cls.category,
+                image=_png_upload("covered.png"),
+            )
+        cls.book.refresh_from_db()
+
+    def test_upload_writes_fixed_width_renditions(self):
+        from PIL import Image
+
+        for width in (200, 400):
+            for fmt in ("webp", "jpg"):
+                path = os.path.join(self.media_root, thumbnail_name(self.book.image.name, width, fmt))
+                with Image.open(path) as thumb:
+                    self.assertEqual(thumb.width, width)
+                    self.assertEqual(thumb.height, width * 1000 // 800)
+
+    def test_listing_uses_srcset_and_api_exposes_thumbnail(self):
+        html = Client().get("/categories/art/").content.decode()
+        self.assertIn('type="image/webp"', html)
+        self.assertIn("-200.webp 200w", html)
+        self.assertNotIn(self.book.image.url, html)
+        data = Client().get("/api/books/").json()["results"][0]
+        self.assertTrue(data["thumbnail_url"].endswith("-400.webp"))
+
+    def test_renditions_are_recorded_and_rendering_never_touches_storage(self):
+        self.assertEqual(self.book.cover_thumbnails, [200, 400])
+        with mock.patch.object(default_storage, "exists", side_effect=AssertionError("exists() called")), \
+                mock.patch("books_market.thumbnails.Image.open", side_effect=AssertionError("Pillow called")):
+            self.assertIn("-400.jpg", Client().get("/categories/art/").content.decode())
+            self.assertIn("-400.webp", Client().get("/api/books/").json()["results"][0]["thumbnail_url"])
+
+    def test_backfill_command_renders_and_records(self):
+        Book.objects.filter(pk=self.book.pk).update(cover_thumbnails=[])
+        default_storage.delete(thumbnail_name(self.book.image.name, 200, "jpg"))
+        out = StringIO()
+        call_command("generate_thumbnails", stdout=out)
+        self.assertIn("Wrote 1 thumbnails for 1 cover(s)", out.getvalue())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.cover_thumbnails, [200, 400])
+
+    def test_backfill_invalidates_cached_pages_and_api_responses(self):
+        Book.objects.filter(pk=self.book.pk).update(cover_thumbnails=[])
+        client = Client()
+        detail_etag = client.get("/books/covered/")["ETag"]
+        category_etag = client.get("/categories/art/")["ETag"]
+        data = client.get("/api/books/").json()["results"][0]
+        self.assertEqual(data["thumbnail_url"], f"http://testserver{self.book.image.url}")
+        call_command("generate_thumbnails", stdout=StringIO())
+        self.assertEqual(client.get("/books/covered/", headers={"If-None-Match": detail_etag}).status_code, 200)
+        self.assertNotEqual(client.get("/categories/art/")["ETag"], category_etag)
+        self.assertTrue(client.get("/api/books/").json()["results"][0]["thumbnail_url"].endswith("-400.webp"))
+
+    def test_new_cover_is_rendered_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            book = Book.objects.create(
+                title="Fresh", slug="fresh", author="A", description="D",
+                published_date=date(2020, 1, 1), category=self.category, image=_png_upload("fresh.png"),
+            )
+        name = thumbnail_name(book.image.name, 200, "webp")
+        self.assertFalse(default_storage.exists(name))
+        html = Client().get("/categories/art/").content.decode()
+        self.assertIn(f'<img src="{book.image.url}"', html)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(default_storage.exists(name))
+        book.refresh_from_db()
+        self.assertEqual(book.cover_thumbnails, [200, 400])
+
+
+class IndexAuditCommandTests(TestCase):
+    def test_all_view_query_paths_use_indexes(self):
+        out = StringIO()
+        call_command("index_audit", stdout=out)
+        self.assertIn("All audited query paths use indexes.", out.getvalue())
+
+
+class ImportBooksCommandTests(TestCase):
+    def setUp(self):
+        self.tech = Category.objects.create(title="Tech", slug="tech", description="D")
+        Book.objects.create(
+            title="Poems", author="A", description="D", published_date=date(2000, 1, 1), category=self.tech,
+        )
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_csv_import_in_batches(self):
+        path = self._write("feed.csv", (
+            "title,author,published_date,description,category,language,language_name\n"
+            "Poems,Keats,1820-07-01,Odes,Poetry,en,English\n"
+            "Poems,Byron,1812-03-10,Cantos,Poetry,en,\n"
+            "Rust Book,Klabnik,2018-06-01,Systems,Tech,,\n"
+        ))
+        out = StringIO()
+        call_command("import_books", path, "--batch-size", "2", stdout=out)
+        self.assertIn("Imported 3 books.", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(
+            sorted(Book.objects.filter(title="Poems").values_list("slug", flat=True)),
+            ["poems", "poems-1", "poems-2"],
+        )
+        poetry = Category.objects.get(title="Poetry")
+        self.assertEqual(poetry.book_count, 2)
+        self.assertEqual(Category.objects.get(pk=self.tech.pk).book_count, 2)
+        self.assertEqual(Language.objects.get(code="en").name, "English")
+        r = Client().get("/search/", {"q": "klabnik"})
+        self.assertEqual([b.slug for b in r.context["books"]], ["rust-book"])
+
+    def test_jsonl_invalid_row_stops_or_is_skipped(self):
+        path = self._write("feed.jsonl", (
+            '{"title": "Good", "author": "A", "published_date": "2020-01-01", "description": "D", "category": "Tech"}\n'
+            '{"title": "Bad", "author": "A", "published_date": "someday", "description": "D", "category": "Tech"}\n'
+        ))
+        with self.assertRaisesMessage(CommandError, "line 2: bad published_date"):
+            call_command("import_books", path, "--batch-size", "1", stdout=StringIO())
+        self.assertTrue(Book.objects.filter(slug="good").exists())
+
+        err = StringIO()
+        call_command("import_books", path, "--skip-invalid", stdout=StringIO(), stderr=err)
+        self.assertIn("Skipped line 2", err.getvalue())
+        self.assertTrue(Book.objects.filter(slug="good-1").exists())
+
+    def test_import_indexes_only_new_books_and_matches_save_slugs(self):
+        Book.objects.create(
+            title="!!!", author="A", description="D", published_date=date(2000, 1, 1), category=self.tech,
+        )
+        path = self._write("feed.jsonl", (
+            '{"title": "???", "author": "Le Guin", "published_date": "1969-03-01", "description": "D", "category": "Tech"}\n'
+        ))
+        with mock.patch.object(SQLiteFTSSearchBackend, "rebuild", side_effect=AssertionError("full rebuild")):
+            call_command("import_books", path, stdout=StringIO())
+        self.assertEqual(sorted(Book.objects.filter(author__in=["A", "Le Guin"]).values_list("slug", flat=True)), [
+            "book", "book-1", "poems",
+        ])
+        r = Client().get("/search/", {"q": "guin"})
+        self.assertEqual([b.slug for b in r.context["books"]], ["book-1"])
+
+
+class ListColumnTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Tech", slug="tech", description="D")
+        Book.objects.create(
+            title="Long Read", slug="long-read", author="A", published_date=date(2020, 1, 1),
+            description=" ".join(f"word{i}" for i in range(5000)), category=cls.category,
+        )
+
+    def test_list_pages_load_only_card_columns(self):
+        for url in ("/categories/", "/categories/tech/", "/search/?q=long"):
+            with self.subTest(url=url), forbid_deferred_loads():
+                response = Client().get(url)
+                self.assertEqual(response.status_code, 200)
+        html = Client().get("/categories/tech/").content.decode()
+        self.assertIn("word24 …", html)
+        self.assertNotIn("word25", html)
+
+    def test_guard_catches_deferred_access(self):
+        book = Book.objects.only("title").get(slug="long-read")
+        with forbid_deferred_loads(), self.assertRaises(AssertionError):
+            book.description
+
+
+class PerformanceBudgetTests(TempMediaMixin, TestCase):
+    def test_every_url_name_has_a_budget(self):
+        self.assertEqual(url_names() - set(BUDGETS), set())
+
+    def test_query_budgets_hold_on_a_small_catalogue(self):
+        seed_catalogue(books=300, categories=5, users=5, favorites_per_user=3, reads_per_user=3)
+        results = measure_budgets(runs=2, check_latency=False)
+        failures = {name: r["problems"] for name, r in results.items() if not r["ok"]}
+        self.assertEqual(failures, {})
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title="Tech", slug="tech", description="D")
+        Book.objects.create(
+            title="Timed", slug="timed", author="A", description="D",
+            published_date=date(2020, 1, 1), category=category,
+        )
+        cls.staff = get_user_model().objects.create_user(username="ops", password="TestPass123!", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        perf_stats.reset()
+        self.addCleanup(perf_stats.reset)
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_server_timing_and_per_view_stats(self):
+        self.client = Client()
+        response = self.client.get("/books/timed/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries", tpl;dur=[\d.]+$')
+        self.client.get("/books/timed/")
+        stats = perf_stats.snapshot()["book_detail"]
+        self.assertEqual(stats["count"], 2)
+        self.assertGreater(stats["db_queries_avg"], 0)
+        self.assertGreater(stats["template_ms_avg"], 0)
+        self.assertEqual(stats["bytes_avg"], len(response.content))
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_server_timing_is_opt_in(self):
+        self.assertNotIn("Server-Timing", Client().get("/books/timed/"))
+        Client().get("/api/books/")
+        self.assertEqual(set(perf_stats.snapshot()), {"book_detail", "BookViewSet.list"})
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        response = Client().get("/books/timed/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(perf_stats.snapshot(), {})
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    async def test_async_views_are_timed(self):
+        response = await AsyncClient().get("/books/timed/read/")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("Server-Timing", response)
+        self.assertEqual(perf_stats.snapshot()["book_read"]["count"], 1)
+
+    def test_stats_endpoints_are_staff_only(self):
+        self.client.get("/books/timed/")
+        self.assertEqual(self.client.get("/admin/perf/").status_code, 302)
+        self.client.force_login(self.staff)
+        data = self.client.get("/admin/perf/").json()
+        self.assertEqual(data["views"]["book_detail"]["count"], 1)
+        metrics = self.client.get("/admin/perf/metrics/")
+        self.assertTrue(metrics["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('django_view_requests_total{view="book_detail"} 1', metrics.content.decode())
+        self.client.post("/admin/perf/")
+        self.assertNotIn("book_detail", self.client.get("/admin/perf/").json()["views"])
+
+
+@override_settings(SLOW_QUERY_FLUSH_SECONDS=0)
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        slow_queries._pending.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title="Tech", slug="tech", description="D")
+        Book.objects.create(
+            title="Secret Garden", slug="secret-garden", author="A", description="D",
+            published_date=date(2020, 1, 1), category=category,
+        )
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM t\n WHERE a = 'it''s' AND b IN (%s, %s, %s) LIMIT 21"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?",
+        )
+
+    @override_settings(SLOW_QUERY_MS=0.000001)
+    def test_slow_queries_are_aggregated_per_shape_and_view(self):
+        self.client.get("/search/", {"q": "garden"})
+        self.client.get("/search/", {"q": "secret"})
+        entries = SlowQuery.objects.filter(view="search_books")
+        self.assertTrue(entries.exists())
+        self.assertEqual({entry.calls for entry in entries}, {2})
+        selects = [entry for entry in entries if entry.sql_shape.startswith("SELECT")]
+        self.assertTrue(selects)
+        for entry in selects:
+            self.assertTrue(entry.explain)
+            self.assertNotIn("garden", entry.sql + entry.sql_shape)
+            self.assertEqual(len(entry.params_fingerprint), 16)
+
+    @override_settings(SLOW_QUERY_MS=0.000001, SLOW_QUERY_FLUSH_SECONDS=3600)
+    def test_entries_are_written_out_of_band_and_survive_a_rollback(self):
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            Book.objects.filter(title__icontains="garden").count()
+            1 / 0
+        self.client.get("/search/", {"q": "garden"})
+        self.assertFalse(SlowQuery.objects.exists())
+        self.assertGreater(slow_queries.flush(), 0)
+        self.assertTrue(SlowQuery.objects.filter(view="", sql_shape__contains="LIKE").exists())
+        self.assertTrue(SlowQuery.objects.filter(view="search_books").exists())
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_disabled_by_zero_threshold(self):
+        self.client.get("/search/", {"q": "garden"})
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+@override_settings(SLOW_QUERY_FLUSH_SECONDS=0)
+class SlowQueryViewLabelTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        slow_queries._pending.clear()
+
+    @override_settings(SLOW_QUERY_MS=0.000001)
+    def test_slow_query_log_names_the_view_method(self):
+        user = get_user_model().objects.create_user(username="user", password="TestPass123!")
+        self.client.force_authenticate(user)
+        self.client.get("/api/me/favorites/")
+        self.assertTrue(SlowQuery.objects.filter(view="FavoritesListCreateView.get").exists())
+        cache.clear()
+        self.client.get("/api/books/")
+        self.assertTrue(SlowQuery.objects.filter(view="BookViewSet.list").exists())
+
+
+class UnreachableEmailBackend(LocmemEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("relay unreachable")
+
+
+class OutboxTests(TestCase):
+    def run_outbox(self, *args):
+        out = StringIO()
+        call_command("run_outbox", "--once", *args, stdout=out)
+        return out.getvalue()
+
+    def test_sends_due_messages_over_one_connection(self):
+        for i in range(3):
+            enqueue_email(f"Subject {i}", "Body", [f"u{i}@example.com"])
+        self.assertEqual(mail.outbox, [])
+        with mock.patch.object(LocmemEmailBackend, "open", autospec=True, return_value=True) as opened:
+            self.assertIn("3 sent", self.run_outbox("--batch-size", "2"))
+        self.assertEqual(opened.call_count, 2)  # one per batch
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["u0@example.com", "u1@example.com", "u2@example.com"])
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.SENT, attempts=1, body="").count(), 3)
+        self.assertIn("0 sent", self.run_outbox())
+
+    @override_settings(EMAIL_BACKEND="books_market.tests.UnreachableEmailBackend")
+    def test_failures_back_off_then_give_up(self):
+        message = enqueue_email("Subject", "Body", ["u@example.com"])
+        self.run_outbox("--max-attempts", "2")
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutgoingEmail.PENDING, 1))
+        self.assertIn("relay unreachable", message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=retry_delay(1) - 5))
+        self.assertIn("0 sent", self.run_outbox("--max-attempts", "2"))  # not due yet
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.run_outbox("--max-attempts", "2")
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.body), (OutgoingEmail.FAILED, 2, ""))
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3, 10)], [60, 120, 240, 3600])
+
+    def test_prune_deletes_old_finished_messages_only(self):
+        old_sent = enqueue_email("Sent", "Body", ["a@example.com"])
+        old_failed = enqueue_email("Failed", "Body", ["b@example.com"])
+        old_pending = enqueue_email("Pending", "Body", ["c@example.com"])
+        recent_sent = enqueue_email("Recent", "Body", ["d@example.com"])
+        OutgoingEmail.objects.filter(pk=old_sent.pk).update(status=OutgoingEmail.SENT)
+        OutgoingEmail.objects.filter(pk=old_failed.pk).update(status=OutgoingEmail.FAILED)
+        OutgoingEmail.objects.filter(pk=recent_sent.pk).update(status=OutgoingEmail.SENT)
+        OutgoingEmail.objects.exclude(pk=recent_sent.pk).update(created_at=timezone.now() - timedelta(days=8))
+        out = StringIO()
+        call_command("prune_outbox", "--dry-run", stdout=out)
+        self.assertIn("Would delete 2 message(s)", out.getvalue())
+        call_command("prune_outbox", stdout=out)
+        self.assertIn("Deleted 2 message(s)", out.getvalue())
+        self.assertEqual(set(OutgoingEmail.objects.values_list("pk", flat=True)), {old_pending.pk, recent_sent.pk})
+
+    def test_admin_hides_the_body(self):
+        staff = get_user_model().objects.create_superuser("admin", "admin@example.com", "AdminPass123!")
+        message = enqueue_email("Password reset", "https://example.com/reset-password/?uid=x&token=y", ["u@example.com"])
+        self.client.force_login(staff)
+        page = self.client.get(reverse("admin:books_market_outgoingemail_change", args=[message.pk]))
+        self.assertEqual(page.status_code, 200)
+        self.assertNotContains(page, "token=y")
+
+
+@override_settings(DEBUG=True)
+class SeedCatalogueCommandTests(TempMediaMixin, TestCase):
+    def test_seeds_books_with_covers_and_files(self):
+        out = StringIO()
+        call_command(
+            "seed_catalogue", "--books", "40", "--categories", "4", "--users", "3",
+            "--covers", "2", "--files", "2", "--file-size", "2048", stdout=out,
+        )
+        self.assertIn("Created", out.getvalue())
+        self.assertEqual(Book.objects.count(), 40)
+        self.assertEqual(sum(Category.objects.values_list("book_count", flat=True)), 40)
+        self.assertEqual(get_user_model().objects.get(username="seed0-user-0").book_favorites.count(), 10)
+        book = Book.objects.order_by("pk")[1]
+        self.assertTrue(os.path.exists(book.image.path))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, thumbnail_name(book.image.name, 200, "webp"))))
+        self.assertGreaterEqual(os.path.getsize(book.file.path), 2048)
+
+    @override_settings(DEBUG=False)
+    def test_refuses_without_debug(self):
+        with self.assertRaisesMessage(CommandError, "--force"):
+            call_command("seed_catalogue", "--books", "1", stdout=StringIO())
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoadScenarioTests(TempMediaMixin, LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        seed_catalogue(books=30, categories=3, users=2, favorites_per_user=2, reads_per_user=2, files=1)
+
+    def test_reports_every_endpoint_of_the_mix(self):
+        result = run_load(self.live_server_url, duration=1, concurrency=2, users=2)
+        endpoints = result["endpoints"]
+        self.assertEqual(endpoints["POST api-token-obtain"]["statuses"], {"200": 2})
+        self.assertGreater(result["requests"], 2)
+        for row in endpoints.values():
+            self.assertLessEqual(row["p50_ms"], row["p95_ms"])
+            self.assertNotIn("500", row["statuses"])
@@ -0,0 +1,135 @@
+"""Fixed-width cover derivatives (WebP and JPEG) for listing pages and the API.
+
+Thumbnails are written next to the media files under ``books/thumbs/`` after
+a cover upload commits (see ``books_market.signals``), and
+``manage.py generate_thumbnails`` backfills older covers. The widths that
+were rendered are recorded in ``Book.cover_thumbnails``. URLs are built from
+that field alone: rendering a page never checks storage or runs Pillow, and
+a width that is not recorded falls back to the full cover. Recording new
+widths touches the books and their categories and bumps the catalogue
+version, so cached pages and API responses pick up the thumbnail URLs.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'books/thumbs'
+DEFAULT_WIDTHS = (200, 400, 600)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def thumbnail_widths():
+    return tuple(getattr(settings, 'BOOK_COVER_WIDTHS', DEFAULT_WIDTHS))
+
+
+def thumbnail_name(source_name, width, fmt):
+    """Storage name of the ``width``-pixel ``fmt`` rendition of ``source_name``."""
+    digest = hashlib.sha1(source_name.encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f'{THUMBNAIL_DIR}/{digest}/{stem}-{width}.{fmt}'
+
+
+def _render(image, width, fmt):
+    pil_format, options = FORMATS[fmt]
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def generate_thumbnails(fieldfile, widths=None, formats=None, force=False):
+    """Write every missing rendition of ``fieldfile``; returns the number written, None if unreadable."""
+    if not fieldfile:
+        return 0
+    wanted = [
+        (width, fmt)
+        for width in (widths or thumbnail_widths())
+        for fmt in (formats or FORMATS)
+        if force or not default_storage.exists(thumbnail_name(fieldfile.name, width, fmt))
+    ]
+    if not wanted:
+        return 0
+    try:
+        with fieldfile.storage.open(fieldfile.name, 'rb') as source:
+            image = Image.open(source)
+            image.load()
+    except (OSError, UnidentifiedImageError):
+        logger.warning("Cannot read cover %s for thumbnails", fieldfile.name, exc_info=True)
+        return None
+    for width, fmt in wanted:
+        name = thumbnail_name(fieldfile.name, width, fmt)
+        if force and default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(_render(image, width, fmt)))
+    return len(wanted)
+
+
+def record_cover_thumbnails(name):
+    """Record the configured widths on every book using cover ``name``; returns the books changed.
+
+    ``update`` skips the save signals, so the books' and their categories'
+    ``updated_at`` are set here; the caller bumps the catalogue version.
+    """
+    from .models import Book, Category
+
+    widths = list(thumbnail_widths())
+    books = Book.objects.filter(image=name).exclude(cover_thumbnails=widths)
+    category_ids = set(books.values_list('category_id', flat=True))
+    if not category_ids:
+        return 0
+    now = timezone.now()
+    changed = books.update(cover_thumbnails=widths, updated_at=now)
+    Category.objects.filter(pk__in=category_ids).update(updated_at=now)
+    return changed
+
+
+def update_cover_thumbnails(name, force=False):
+    """Render cover ``name``'s missing renditions and record them on every book using it.
+
+    Returns the number of renditions written, or None if the cover cannot be read.
+    """
+    from .catalogue import bump_catalogue_version
+    from .models import Book
+
+    written = generate_thumbnails(Book(image=name).image, force=force)
+    if written is not None and record_cover_thumbnails(name):
+        bump_catalogue_version()
+    return written
+
+
+def thumbnail_url(fieldfile, width, fmt='webp', rendered=()):
+    """URL of a cover rendition; the cover's own URL when ``width`` is not in ``rendered``.
+
+    ``rendered`` is the book's ``cover_thumbnails``.
+    """
+    if not fieldfile:
+        return None
+    if width not in rendered:
+        return fieldfile.url
+    return default_storage.url(thumbnail_name(fieldfile.name, width, fmt))
+
+
+def thumbnail_srcset(fieldfile, rendered, fmt='webp'):
+    return ', '.join(
+        f'{default_storage.url(thumbnail_name(fieldfile.name, w, fmt))} {w}w'
+        for w in thumbnail_widths() if w in rendered
+    )
@@ -1,15 +1,24 @@
-import os
-import mimetypes
 import json
-
-from django.shortcuts import render, get_object_or_404
-from django.http import FileResponse, Http404, HttpResponse
-from django.db.models import Count, Q
-from django.core.paginator import Paginator
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.template.loader import render_to_string
+from django.http import Http404, HttpResponse, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Max
+from django.db.models.functions import Substr
+from django.views.decorators.http import condition
 from django.templatetags.static import static
 
+from .files import aserve_protected_file
+from .instrumentation import perf_stats
 from .models import Category, Book
+from .pagination import InvalidCursor, keyset_condition, keyset_paginate
+from .search import search_queryset
 
 
 def theme_css(request):
@@ -33,83 +42,183 @@ def about(request):
     return render(request, 'books_market/about.html')
 
 
+def _once_per_request(func):
+    """Memoize a condition() probe on the request so ETag and Last-Modified share one query."""
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        attr = f'_{func.__name__}_result'
+        if not hasattr(request, attr):
+            setattr(request, attr, func(request, *args, **kwargs))
+        return getattr(request, attr)
+    return wrapper
+
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+@_once_per_request
+def _category_list_state(request):
+    return Category.objects.aggregate(modified=Max('updated_at'), total=Count('pk'))
+
+
+def _category_list_etag(request):
+    state = _category_list_state(request)
+    return _etag('category_list', state['modified'], state['total'])
+
+
+def _category_list_modified(request):
+    return _category_list_state(request)['modified']
+
+
+@condition(etag_func=_category_list_etag, last_modified_func=_category_list_modified)
 def category_list(request):
-    categories = Category.objects.annotate(book_count=Count('book')).order_by('title')
+    categories = Category.objects.only('slug', 'title', 'description', 'book_count').order_by('title')
     return render(request, 'books_market/category_list.html', {'categories': categories})
 
 
+CATEGORY_PAGE_SIZE = 24
+# Characters of description loaded for list cards; comfortably more than the 25 words shown.
+EXCERPT_CHARS = 500
+
+
+def book_card_queryset():
+    """Books with just the columns a list card renders (see category_detail.html and search.html).
+
+    ``excerpt`` replaces the full ``description`` TextField.
+    """
+    return Book.objects.only('id', 'slug', 'title', 'author', 'image', 'cover_thumbnails').annotate(
+        excerpt=Substr('description', 1, EXCERPT_CHARS),
+    )
+
+
+@_once_per_request
+def _category_modified(request, slug):
+    return Category.objects.filter(slug=slug).values_list('updated_at', flat=True).first()
+
+
+def _category_detail_etag(request, slug):
+    modified = _category_modified(request, slug)
+    if modified is None:
+        return None
+    return _etag('category_detail', slug, request.GET.get('cursor', ''), modified)
+
+
+@condition(etag_func=_category_detail_etag, last_modified_func=_category_modified)
 def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug)
-    books_qs = Book.objects.filter(category=category).select_related('category', 'language').order_by('title')
-    paginator = Paginator(books_qs, 24)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    books_qs = book_card_queryset().filter(category=category)
+    try:
+        page = keyset_paginate(
+            books_qs, ('title', 'id'), cursor=request.GET.get('cursor'), page_size=CATEGORY_PAGE_SIZE
+        )
+    except InvalidCursor:
+        raise Http404("Invalid page")
     return render(request, 'books_market/category_detail.html', {
         'category': category,
-        'page_obj': page_obj,
-        'paginator': paginator,
+        'page': page,
     })
 
 
+@_once_per_request
+def _book_modified(request, slug):
+    """Newest of the book and its category (related books and category title live on the page)."""
+    row = Book.objects.filter(slug=slug).values_list('updated_at', 'category__updated_at').first()
+    return max(row) if row else None
+
+
+def _book_detail_etag(request, slug):
+    modified = _book_modified(request, slug)
+    if modified is None:
+        return None
+    # The file actions block depends on whether the visitor is signed in.
+    return _etag('book_detail', slug, modified, request.user.is_authenticated)
+
+
+@condition(etag_func=_book_detail_etag, last_modified_func=_book_modified)
 def book_detail(request, slug):
     book = get_object_or_404(Book.objects.select_related('category', 'language'), slug=slug)
-    related_books = (
-        Book.objects.filter(category=book.category)
-        .exclude(pk=book.pk)
-        .select_related('category', 'language')[:4]
-    )
-    image_url = None
-    if book.image:
-        image_url = request.build_absolute_uri(book.image.url)
-    json_ld = json.dumps({
-        "@context": "https://schema.org",
-        "@type": "Book",
-        "name": book.title,
-        "author": book.author,
-        "description": (book.description or "")[:500],
-        "image": image_url,
-    }, ensure_ascii=False)
+    fragments = _book_detail_fragments(request, book)
     return render(request, 'books_market/book_detail.html', {
         'book': book,
         'user_can_access_file': request.user.is_authenticated,
-        'related_books': related_books,
-        'json_ld': json_ld,
+        'related_html': fragments['related_html'],
+        'json_ld': fragments['json_ld'],
     })
 
 
-def _serve_book_file(book, as_attachment: bool):
-    """Serves the book file to authenticated users. Ensures the file handle is closed."""
-    if not book.file:
-        raise Http404("File not available")
-    path = book.file.path
-    if not os.path.isfile(path):
-        raise Http404("File not found")
-    filename = os.path.basename(book.file.name)
-    content_type, _ = mimetypes.guess_type(filename)
-    if not content_type:
-        content_type = "application/octet-stream"
-    f = open(path, "rb")
-    try:
-        response = FileResponse(f, as_attachment=as_attachment, filename=filename)
-        response["Content-Type"] = content_type
-        return response
-    except Exception:
-        f.close()
-        raise
+RELATED_BOOKS = 4
+
+
+def related_books_queryset(book):
+    """The books after ``book`` in its category's title order (book_category_title_idx)."""
+    return (
+        Book.objects.only('id', 'slug', 'title', 'author', 'image', 'cover_thumbnails')
+        .filter(category_id=book.category_id)
+        .order_by('title', 'id')
+    )
+
+
+def related_books(book):
+    """Up to ``RELATED_BOOKS`` category neighbours of ``book``, wrapping round to the first titles.
+
+    Stable for a given catalogue, unlike an unordered slice, and read by index.
+    """
+    books = related_books_queryset(book)
+    related = list(books.filter(keyset_condition(('title', 'id'), (book.title, book.pk)))[:RELATED_BOOKS])
+    if len(related) < RELATED_BOOKS:
+        seen = {b.pk for b in related} | {book.pk}
+        related += [b for b in books[:RELATED_BOOKS + 1] if b.pk not in seen][:RELATED_BOOKS - len(related)]
+    return related
+
+
+def _book_detail_fragments(request, book):
+    """Related-books HTML and JSON-LD for ``book``, cached until the book or its category changes.
+
+    Any save, delete or move of a book in the category bumps ``category.updated_at``
+    (see books_market.signals and the importer), so the key moves with membership.
+    """
+    origin = f'{request.scheme}://{request.get_host()}'
+    key = 'book_detail:fragments:' + _etag(book.pk, book.updated_at, book.category.updated_at, origin)
+    fragments = cache.get(key)
+    if fragments is None:
+        fragments = {
+            'related_html': render_to_string(
+                'books_market/book_related.html', {'related_books': related_books(book)}, request=request,
+            ),
+            'json_ld': json.dumps({
+                "@context": "https://schema.org",
+                "@type": "Book",
+                "name": book.title,
+                "author": book.author,
+                "description": (book.description or "")[:500],
+                "image": f'{origin}{book.image.url}' if book.image else None,
+            }, ensure_ascii=False),
+        }
+        cache.set(key, fragments, settings.CATALOGUE_CACHE_TIMEOUT)
+    return fragments
+
+
+async def _serve_book_file(request, book, as_attachment: bool):
+    """Serves the book file to authenticated users (see books_market.files for delivery modes).
+
+    Async so that under ASGI a long download streams without pinning a worker thread.
+    """
+    return await aserve_protected_file(request, book.file, as_attachment=as_attachment)
 
 
 @login_required
-def book_read(request, slug):
+async def book_read(request, slug):
     """Serve the book file for viewing in the browser (inline)."""
-    book = get_object_or_404(Book, slug=slug)
-    return _serve_book_file(book, as_attachment=False)
+    book = await aget_object_or_404(Book, slug=slug)
+    return await _serve_book_file(request, book, as_attachment=False)
 
 
 @login_required
-def book_download(request, slug):
+async def book_download(request, slug):
     """Serve the book file for download (attachment)."""
-    book = get_object_or_404(Book, slug=slug)
-    return _serve_book_file(book, as_attachment=True)
+    book = await aget_object_or_404(Book, slug=slug)
+    return await _serve_book_file(request, book, as_attachment=True)
 
 
 def register_page(request):
@@ -146,11 +255,10 @@ def search_books(request):
     q = (request.GET.get('q') or '').strip()
     books = []
     if q:
-        books = (
-            Book.objects.filter(
-                Q(title__icontains=q) | Q(author__icontains=q)
-            )
-            .select_related('category', 'language')[:SEARCH_RESULTS_LIMIT]
+        books = search_queryset(
+            book_card_queryset(),
+            q,
+            limit=SEARCH_RESULTS_LIMIT,
         )
     return render(request, 'books_market/search.html', {
         'query': q,
@@ -158,5 +266,23 @@ def search_books(request):
     })
 
 
+@staff_member_required
+def perf_stats_view(request):
+    """Per-view timings from PerformanceMiddleware for this process; POST resets them."""
+    if request.method == 'POST':
+        perf_stats.reset()
+    return JsonResponse({
+        'sample_rate': settings.PERF_SAMPLE_RATE,
+        'window': perf_stats.window,
+        'views': perf_stats.snapshot(),
+    })
+
+
+@staff_member_required
+def perf_metrics_view(request):
+    """The same figures in Prometheus text format."""
+    return HttpResponse(perf_stats.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def handler500(request):
     return render(request, '500.html', status=500)
\ No newline at end of file
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Connections opened in sync_to_async threads are not closed reliably under
+# ASGI, so persistent connections are off unless explicitly configured.
+os.environ.setdefault('DJANGO_DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -57,13 +57,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'books_market.instrumentation.PerformanceMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for PerformanceMiddleware.
+        'BACKEND': 'books_market.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,12 +84,80 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DJANGO_DB_ENGINE switches backends (e.g. django.db.backends.postgresql, which
+# reads the DJANGO_DB_* connection settings). Connections are kept for
+# DJANGO_DB_CONN_MAX_AGE seconds (0 in DEBUG: runserver uses a thread per request;
+# config/asgi.py also defaults it to 0, as Django advises for ASGI) and, with
+# DJANGO_DB_CONN_HEALTH_CHECKS, checked before reuse.
+# SQLite runs in WAL mode so readers never block the writer, with
+# synchronous=NORMAL (durable at checkpoints, safe against corruption),
+# memory-mapped reads and a busy timeout. Transactions start IMMEDIATE: a
+# deferred one that reads and then writes fails at once with "database is
+# locked" when another writer is active, instead of waiting for the timeout.
+# Tests run on a file (DJANGO_TEST_DB_NAME) rather than in memory, so the live
+# server's request threads each get their own connection, as in production.
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'django.db.backends.sqlite3')
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': DB_ENGINE,
+        'NAME': os.environ.get('DJANGO_DB_NAME') or BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '0' if DEBUG else '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DJANGO_DB_CONN_HEALTH_CHECKS', 'true').lower() in ('1', 'true', 'yes'),
     }
 }
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '20'))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    DATABASES['default']['TEST'] = {
+        'NAME': os.environ.get('DJANGO_TEST_DB_NAME') or BASE_DIR / 'test_db.sqlite3',
+    }
+    DATABASES['default']['OPTIONS'] = {
+        'timeout': SQLITE_BUSY_TIMEOUT,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            f'PRAGMA mmap_size={SQLITE_MMAP_SIZE};'
+            'PRAGMA temp_store=MEMORY'
+        ),
+    }
+else:
+    DATABASES['default'].update({
+        'USER': os.environ.get('DJANGO_DB_USER', ''),
+        'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+        'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+        'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+    })
+
+
+# Cache
+# Local memory by default. With several worker processes use a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) so catalogue invalidation
+# reaches every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a cached catalogue API response may live; catalogue changes invalidate it sooner.
+CATALOGUE_CACHE_TIMEOUT = int(os.environ.get('CATALOGUE_CACHE_TIMEOUT', '600'))
+
+# Request instrumentation (books_market.instrumentation): share of requests
+# timed, whether sampled responses carry Server-Timing (it exposes database
+# and template timings, so only in DEBUG by default), and how many recent
+# requests per view the percentiles cover.
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', '1.0'))
+PERF_SERVER_TIMING = os.environ.get('PERF_SERVER_TIMING', str(DEBUG)).lower() in ('1', 'true', 'yes')
+PERF_WINDOW = int(os.environ.get('PERF_WINDOW', '1000'))
+
+# Queries slower than this many milliseconds are logged to the SlowQuery admin
+# (books_market.slow_queries). 0 turns the log off. Entries are buffered in
+# memory and written after a response, at most every SLOW_QUERY_FLUSH_SECONDS.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_FLUSH_SECONDS = float(os.environ.get('SLOW_QUERY_FLUSH_SECONDS', '10'))
 
 
 # Password validation
@@ -141,6 +211,15 @@ LOGIN_REDIRECT_URL = '/welcome/'
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Cover thumbnail widths in pixels (books_market.thumbnails); WebP and JPEG are written for each.
+BOOK_COVER_WIDTHS = [200, 400, 600]
+
+# Book file delivery (books_market.files): 'django' streams with Range support;
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd) lets the proxy send the bytes.
+BOOK_FILE_DELIVERY = os.environ.get('BOOK_FILE_DELIVERY', 'django')
+# nginx internal location that maps to MEDIA_ROOT (x-accel-redirect only).
+BOOK_FILE_ACCEL_PREFIX = os.environ.get('BOOK_FILE_ACCEL_PREFIX', '/protected-media/')
+
 # Django REST Framework
 _drf_renderers = ['rest_framework.renderers.JSONRenderer']
 if DEBUG:
@@ -153,8 +232,8 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': _drf_renderers,
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'api.throttling.AnonRateThrottle',
+        'api.throttling.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
@@ -163,6 +242,17 @@ REST_FRAMEWORK = {
     },
 }
 
+# Throttle counters (api.throttling): the store they live in, the SQLite file
+# for SQLiteThrottleStore, and 'sliding' or 'fixed' windows.
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE') or 'api.throttling.CacheThrottleStore'
+THROTTLE_SQLITE_PATH = os.environ.get('THROTTLE_SQLITE_PATH') or BASE_DIR / 'throttle.sqlite3'
+THROTTLE_WINDOW = os.environ.get('THROTTLE_WINDOW', 'sliding')
+
+# Book search: dotted path to a books_market.search.SearchBackend subclass.
+# Unset = SQLite FTS5 index on SQLite, icontains scans on other databases.
+BOOK_SEARCH_BACKEND = os.environ.get('BOOK_SEARCH_BACKEND') or None
+BOOK_SEARCH_MAX_RESULTS = 1000
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -4,7 +4,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from books_market.views import perf_metrics_view, perf_stats_view
+
 urlpatterns = [
+    path('admin/perf/', perf_stats_view, name='perf_stats'),
+    path('admin/perf/metrics/', perf_metrics_view, name='perf_metrics'),
     path('admin/', admin.site.urls),
     path('', include('books_market.urls')),
     path('api/', include('api.urls')),
@@ -9,6 +9,7 @@
     var BASE_PATH = (typeof window !== 'undefined' && window.location && window.location.origin) ? window.location.origin : '';
     var API_FAVORITES = BASE_PATH + '/api/me/favorites/';
     var API_READ = BASE_PATH + '/api/me/read/';
+    var API_BOOK_STATE = BASE_PATH + '/api/me/books/';
 
     var ICONS = {
         heartOutline: '<svg class="icon icon--btn" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" aria-hidden="true"><path d="M20.84 4.61a5.5 5.5 0 0 0-7.78 0L12 5.67l-1.06-1.06a5.5 5.5 0 0 0-7.78 7.78l1.06 1.06L12 21.23l7.78-7.78 1.06-1.06a5.5 5.5 0 0 0 0-7.78z"></path></svg>',
@@ -31,20 +32,13 @@
     }
 
     // --- API ---
-    function fetchFavorites() {
+    function fetchBookState(slug) {
         var headers = getAuthHeaders();
-        if (!headers) return Promise.resolve([]);
-        return fetch(API_FAVORITES, { headers: headers })
-            .then(function (r) { return r.json(); })
-            .catch(function () { return []; });
-    }
-
-    function fetchReadList() {
-        var headers = getAuthHeaders();
-        if (!headers) return Promise.resolve([]);
-        return fetch(API_READ, { headers: headers })
-            .then(function (r) { return r.json(); })
-            .catch(function () { return []; });
+        var empty = { in_favorites: false, in_read: false };
+        if (!headers) return Promise.resolve(empty);
+        return fetch(API_BOOK_STATE + encodeURIComponent(slug) + '/state/', { headers: headers })
+            .then(function (r) { return r.ok ? r.json() : empty; })
+            .catch(function () { return empty; });
     }
 
     function addFavorite(slug) {
@@ -162,11 +156,9 @@
         var btnRead = document.getElementById('btn-read');
         var state = { inFavorites: false, inRead: false };
 
-        Promise.all([fetchFavorites(), fetchReadList()]).then(function (results) {
-            var favList = Array.isArray(results[0]) ? results[0] : [];
-            var readList = Array.isArray(results[1]) ? results[1] : [];
-            state.inFavorites = favList.some(function (b) { return b.slug === bookSlug; });
-            state.inRead = readList.some(function (b) { return b.slug === bookSlug; });
+        fetchBookState(bookSlug).then(function (bookState) {
+            state.inFavorites = !!bookState.in_favorites;
+            state.inRead = !!bookState.in_read;
             updateFavoriteButton(btnFav, state.inFavorites);
             updateReadButton(btnRead, state.inRead);
         });